@@ -0,0 +1 @@
+"""Benchmark harness (python -m bench); not part of the server."""
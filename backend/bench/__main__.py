@@ -0,0 +1,138 @@
+"""
+Benchmark harness against a local fake Gemini backend (no quota is used).
+
+    cd backend
+    python -m bench --scenarios crew,stream,upload --iterations 20 --concurrency 4
+    python -m bench --save-baseline bench/baseline.json
+    python -m bench --baseline bench/baseline.json      # exit code 1 on regression
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SCENARIOS = ("crew", "stream", "upload")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default="crew,stream,upload", help=f"comma-separated subset of {','.join(SCENARIOS)}")
+    parser.add_argument("--iterations", type=int, default=10, help="runs per scenario")
+    parser.add_argument("--concurrency", type=int, default=2, help="runs in flight at once")
+    parser.add_argument("--topic", default="Reinforcement Learning")
+    parser.add_argument("--notes-words", type=int, default=1500, help="size of the generated study notes")
+    parser.add_argument("--timeout", type=float, default=600.0, help="per-request HTTP timeout (seconds)")
+
+    backend = parser.add_argument_group("fake Gemini backend")
+    backend.add_argument("--latency", default="lognormal:0.8,0.4",
+                         help="fixed:S | uniform:A,B | lognormal:MEDIAN,SIGMA | exp:MEAN (seconds before the first token)")
+    backend.add_argument("--token-rate", type=float, default=120.0, help="completion tokens per second")
+    backend.add_argument("--completion-tokens", type=int, default=400, help="mean completion length")
+    backend.add_argument("--error-rate", type=float, default=0.0, help="share of calls answered with a 429")
+    backend.add_argument("--retry-after", type=float, default=1.0, help="retry hint carried by injected 429s")
+    backend.add_argument("--seed", type=int, default=7)
+
+    deployment = parser.add_argument_group("deployment under test")
+    deployment.add_argument("--keys", type=int, default=1, help="number of fake API keys in the pool")
+    deployment.add_argument("--rpm", type=int, help="override LLM_RPM per key")
+    deployment.add_argument("--llm-cache", action="store_true", help="keep the LLM response cache on")
+    deployment.add_argument("--output-dir", type=Path, help="OUTPUT_DIR for the run (default: fresh temp dir)")
+
+    corpus = parser.add_argument_group("upload corpus")
+    corpus.add_argument("--corpus", type=Path, help="directory of PDF/DOCX/PPTX files (default: generated)")
+    corpus.add_argument("--pages", type=int, default=20, help="pages/slides per generated file")
+
+    report = parser.add_argument_group("report")
+    report.add_argument("--output", type=Path, help="write the results JSON here")
+    report.add_argument("--save-baseline", type=Path, help="write the results as the new baseline")
+    report.add_argument("--baseline", type=Path, help="compare against this baseline")
+    report.add_argument("--tolerance", type=float, default=0.15, help="allowed regression (0.15 = 15%%)")
+    return parser.parse_args(argv)
+
+
+def configure_environment(args) -> Path:
+    """Settings are read at import time, so the deployment is configured before importing src"""
+    output_dir = args.output_dir or Path(tempfile.mkdtemp(prefix="smartstudy-bench-"))
+    os.environ["OUTPUT_DIR"] = str(output_dir)
+    os.environ["GOOGLE_API_KEYS"] = ",".join(f"bench-key-{i}" for i in range(max(1, args.keys)))
+    os.environ["LLM_CACHE_ENABLED"] = "true" if args.llm_cache else "false"
+    os.environ["SESSION_SWEEP_SECONDS"] = str(24 * 3600)
+    if args.rpm:
+        os.environ["LLM_RPM"] = str(args.rpm)
+    return output_dir
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        print(f"Unknown scenarios: {', '.join(sorted(unknown))}", file=sys.stderr)
+        return 2
+    output_dir = configure_environment(args)
+
+    import random
+    from .corpus import build_corpus, load_corpus, lorem
+    from .fake_gemini import FakeGeminiBackend
+    from .harness import (LocalServer, compare, crew_job, format_report, load_json, peak_rss_mb,
+                          run_concurrently, save_json, stream_job, upload_job)
+
+    backend = FakeGeminiBackend(
+        latency=args.latency,
+        tokens_per_second=args.token_rate,
+        completion_tokens=args.completion_tokens,
+        error_rate=args.error_rate,
+        retry_after=args.retry_after,
+        seed=args.seed,
+    )
+    rng = random.Random(args.seed)
+    notes = "\n\n".join(lorem(rng, 100) for _ in range(max(1, args.notes_words // 100)))
+
+    results = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items()
+                   if k not in ("output", "save_baseline", "baseline")},
+        "scenarios": {},
+    }
+    with backend.installed():
+        if "crew" in scenarios:
+            results["scenarios"]["crew"] = run_concurrently(crew_job(args.topic, notes), args.iterations, args.concurrency)
+        if "stream" in scenarios or "upload" in scenarios:
+            from main import app
+
+            with LocalServer(app) as server:
+                if "stream" in scenarios:
+                    job = stream_job(server.url, args.topic, notes, args.timeout)
+                    results["scenarios"]["stream"] = run_concurrently(job, args.iterations, args.concurrency)
+                if "upload" in scenarios:
+                    # Distinct files by default, so every upload is a cold extraction
+                    files = load_corpus(args.corpus) if args.corpus else build_corpus(
+                        output_dir / "bench_corpus", args.iterations, pages=args.pages, seed=args.seed)
+                    job = upload_job(server.url, files, args.timeout)
+                    results["scenarios"]["upload"] = run_concurrently(job, args.iterations, args.concurrency)
+    results["peak_rss_mb"] = peak_rss_mb()
+    results["backend"] = backend.stats()
+
+    print("\n=== SmartStudy benchmark ===")
+    print(format_report(results))
+    if args.output:
+        save_json(args.output, results)
+    if args.save_baseline:
+        save_json(args.save_baseline, results)
+        print(f"Baseline saved to {args.save_baseline}")
+    if args.baseline:
+        regressions = compare(results, load_json(args.baseline), args.tolerance)
+        if regressions:
+            print(f"Regressions vs {args.baseline} (tolerance {args.tolerance:.0%}):")
+            for line in regressions:
+                print(f"  - {line}")
+            return 1
+        print(f"No regressions vs {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
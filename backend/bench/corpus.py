@@ -0,0 +1,94 @@
+import random
+from pathlib import Path
+from typing import List
+
+WORDS = (
+    "gradient descent convergence entropy markov policy reward value function bellman equation "
+    "eigenvalue matrix vector probability distribution variance estimator likelihood bayes prior "
+    "posterior sampling kernel regression classification neural network activation backpropagation"
+).split()
+
+FORMATS = ("pdf", "docx", "pptx")
+
+
+def lorem(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path: Path, pages: List[List[str]]):
+    """Minimal text PDF (one Helvetica content stream per page) that pypdf can extract"""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for lines in pages:
+        stream = "BT /F1 10 Tf 50 780 Td 12 TL " + " ".join(f"({_pdf_escape(line)}) '" for line in lines) + " ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream".encode("latin-1"))
+        content_id = len(objects)
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>".encode("latin-1")
+        )
+        page_ids.append(len(objects))
+    kids = " ".join(f"{i} 0 R" for i in page_ids)
+    objects[1] = f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode("latin-1")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode("latin-1") + body + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    out += b"".join(f"{o:010d} 00000 n \n".encode("latin-1") for o in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    path.write_bytes(bytes(out))
+
+
+def write_docx(path: Path, paragraphs: List[str]):
+    from docx import Document
+
+    doc = Document()
+    for paragraph in paragraphs:
+        doc.add_paragraph(paragraph)
+    doc.save(str(path))
+
+
+def write_pptx(path: Path, slides: List[List[str]]):
+    from pptx import Presentation
+
+    prs = Presentation()
+    for lines in slides:
+        slide = prs.slides.add_slide(prs.slide_layouts[1])
+        slide.shapes.title.text = lines[0]
+        slide.placeholders[1].text = "\n".join(lines[1:])
+    prs.save(str(path))
+
+
+def build_corpus(directory: Path, count: int, pages: int = 20, seed: int = 7) -> List[Path]:
+    """`count` distinct sample files cycling PDF, DOCX and PPTX (same seed, same text)"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    files = []
+    for i in range(count):
+        rng = random.Random(seed * 100003 + i)
+        fmt = FORMATS[i % len(FORMATS)]
+        path = directory / f"sample_{i:03d}.{fmt}"
+        files.append(path)
+        if path.exists():
+            continue
+        sections = [[f"Lecture {i + 1}.{p + 1}"] + [lorem(rng, 12) for _ in range(30)] for p in range(pages)]
+        if fmt == "pdf":
+            write_pdf(path, sections)
+        elif fmt == "docx":
+            write_docx(path, [line for section in sections for line in section])
+        else:
+            write_pptx(path, [section[:8] for section in sections])
+    return files
+
+
+def load_corpus(directory: Path) -> List[Path]:
+    """Existing PDF / DOCX / PPTX files of a user-supplied corpus"""
+    return sorted(p for p in Path(directory).iterdir() if p.suffix.lower().lstrip(".") in FORMATS)
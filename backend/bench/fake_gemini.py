@@ -0,0 +1,137 @@
+import hashlib
+import math
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+class LatencyDistribution:
+    """
+    Seconds of model latency, parsed from a spec string:
+    "fixed:0.8", "uniform:0.2,1.5", "lognormal:0.8,0.5" (median, sigma)
+    or "exp:0.8" (mean).
+    """
+
+    def __init__(self, spec: str):
+        kind, _, params = spec.partition(":")
+        self.spec = spec
+        self.kind = kind.strip().lower()
+        self.params = [float(p) for p in params.split(",") if p.strip()]
+        expected = {"fixed": 1, "uniform": 2, "lognormal": 2, "exp": 1}
+        if self.kind not in expected or len(self.params) != expected[self.kind]:
+            raise ValueError(f"Bad latency spec '{spec}' (use fixed:S, uniform:A,B, lognormal:MEDIAN,SIGMA or exp:MEAN)")
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "fixed":
+            return self.params[0]
+        if self.kind == "uniform":
+            return rng.uniform(*self.params)
+        if self.kind == "lognormal":
+            median, sigma = self.params
+            return rng.lognormvariate(math.log(median), sigma)
+        return rng.expovariate(1.0 / self.params[0])
+
+
+class FakeQuotaError(Exception):
+    """Shaped like Gemini's 429 so is_quota_error / parse_retry_after treat it as the real thing"""
+
+
+class FakeGeminiBackend:
+    """
+    Local stand-in for the Gemini API behind ChatGoogleGenerativeAI.
+    Patches ChatGoogleGenerativeAI._generate and _stream, so QuotaSafeLLM, the key pool,
+    the quota scheduler and the response cache all run unchanged in front of
+    it. Latency, token rate, response length and the share of 429s are
+    configurable; with a fixed seed the sequence of samples is reproducible.
+    """
+
+    def __init__(self, latency: str = "lognormal:0.8,0.4", tokens_per_second: float = 120.0,
+                 completion_tokens: int = 400, error_rate: float = 0.0, retry_after: float = 1.0,
+                 seed: int = 7):
+        self.latency = LatencyDistribution(latency)
+        self.tokens_per_second = tokens_per_second
+        self.completion_tokens = completion_tokens
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+
+    def _draw(self):
+        with self._lock:
+            self.calls += 1
+            failed = self._rng.random() < self.error_rate
+            if failed:
+                self.errors += 1
+            return failed, self.latency.sample(self._rng), self._rng.uniform(0.7, 1.3)
+
+    def _start(self, messages):
+        """Draw one call and wait out its latency; (prompt, completion tokens, usage)"""
+        prompt = "".join(str(m.content) for m in messages)
+        failed, latency, length_factor = self._draw()
+        if failed:
+            time.sleep(min(latency, 0.2))
+            raise FakeQuotaError(
+                f"429 RESOURCE_EXHAUSTED: Quota exceeded (fake backend). Please retry in {self.retry_after}s."
+            )
+        time.sleep(latency)
+        completion_tokens = max(1, int(self.completion_tokens * length_factor))
+        prompt_tokens = max(1, len(prompt) // 4)
+        usage = {"input_tokens": prompt_tokens, "output_tokens": completion_tokens,
+                 "total_tokens": prompt_tokens + completion_tokens}
+        return prompt, completion_tokens, usage
+
+    def respond(self, messages) -> ChatResult:
+        prompt, completion_tokens, usage = self._start(messages)
+        time.sleep(completion_tokens / self.tokens_per_second)
+        message = AIMessage(content=self.completion_text(prompt, completion_tokens), usage_metadata=usage)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def stream(self, messages, chunk_tokens: int = 16):
+        """Same answer as respond(), delivered in chunks at the configured token rate"""
+        prompt, completion_tokens, usage = self._start(messages)
+        words = self.completion_text(prompt, completion_tokens).split(" ")
+        step = max(1, chunk_tokens // 4)  # completion_text spends ~4 tokens per word
+        for i in range(0, len(words), step):
+            time.sleep(step * 4 / self.tokens_per_second)
+            text = " ".join(words[i:i + step]) + (" " if i + step < len(words) else "")
+            # Usage rides on the last chunk, as Gemini reports it
+            last = i + step >= len(words)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=text, usage_metadata=usage if last else None))
+
+    @staticmethod
+    def completion_text(prompt: str, tokens: int) -> str:
+        """Deterministic markdown answer of roughly `tokens` tokens; ends the agent loop"""
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        body = " ".join(f"point-{digest[i % 56:i % 56 + 8]}" for i in range(max(1, tokens // 4)))
+        # CrewAI agents stop iterating once they see a final answer
+        return f"Thought: I now know the final answer\nFinal Answer: # Benchmark Output\n\n{body}"
+
+    @contextmanager
+    def installed(self):
+        """Route every Gemini call in this process to the fake backend"""
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
+        backend = self
+        originals = ChatGoogleGenerativeAI._generate, ChatGoogleGenerativeAI._stream
+
+        def _generate(llm, messages, stop=None, run_manager=None, **kwargs):
+            return backend.respond(messages)
+
+        def _stream(llm, messages, stop=None, run_manager=None, **kwargs):
+            return backend.stream(messages)
+
+        ChatGoogleGenerativeAI._generate, ChatGoogleGenerativeAI._stream = _generate, _stream
+        try:
+            yield self
+        finally:
+            ChatGoogleGenerativeAI._generate, ChatGoogleGenerativeAI._stream = originals
+
+    def stats(self) -> dict:
+        return {"calls": self.calls, "injected_429s": self.errors}
+
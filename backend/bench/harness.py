@@ -0,0 +1,230 @@
+import json
+import math
+import resource
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import httpx
+
+# Lower is better for latencies, higher for throughput
+LOWER_IS_BETTER = ("p50", "p95", "p99", "ttfb_p50", "ttfb_p95", "first_delta_p95", "first_section_p95")
+HIGHER_IS_BETTER = ("runs_per_min",)
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def peak_rss_mb() -> Dict[str, float]:
+    """Peak resident set size of this process and of its (extraction) child processes"""
+    per_mb = 1024 * 1024 if sys.platform == "darwin" else 1024  # ru_maxrss is bytes on macOS, KiB on Linux
+    return {
+        "self": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / per_mb, 1),
+        "children": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / per_mb, 1),
+    }
+
+
+class Sample:
+    """Outcome of one benchmarked operation"""
+
+    def __init__(self, seconds: float, ok: bool, ttfb: Optional[float] = None,
+                 first_delta: Optional[float] = None, first_section: Optional[float] = None, error: str = ""):
+        self.seconds = seconds
+        self.ok = ok
+        self.ttfb = ttfb
+        self.first_delta = first_delta
+        self.first_section = first_section
+        self.error = error
+
+
+def run_concurrently(job: Callable[[int], Sample], iterations: int, concurrency: int) -> Dict:
+    """Run job(0..iterations-1) with `concurrency` in flight and summarize the samples"""
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="bench") as pool:
+        samples = list(pool.map(job, range(iterations)))
+    wall = time.monotonic() - started
+
+    ok = [s for s in samples if s.ok]
+    latencies = [s.seconds for s in ok]
+    ttfbs = [s.ttfb for s in ok if s.ttfb is not None]
+    deltas = [s.first_delta for s in ok if s.first_delta is not None]
+    sections = [s.first_section for s in ok if s.first_section is not None]
+    summary = {
+        "runs": len(samples),
+        "errors": len(samples) - len(ok),
+        "concurrency": concurrency,
+        "wall_seconds": round(wall, 3),
+        "runs_per_min": round(len(ok) / wall * 60, 2) if wall else 0.0,
+        "mean": round(sum(latencies) / len(latencies), 4) if latencies else None,
+    }
+    for pct in (50, 95, 99):
+        value = percentile(latencies, pct)
+        summary[f"p{pct}"] = round(value, 4) if value is not None else None
+    if ttfbs:
+        summary["ttfb_p50"] = round(percentile(ttfbs, 50), 4)
+        summary["ttfb_p95"] = round(percentile(ttfbs, 95), 4)
+    if deltas:
+        summary["first_delta_p95"] = round(percentile(deltas, 95), 4)
+    if sections:
+        summary["first_section_p95"] = round(percentile(sections, 95), 4)
+    errors = sorted({s.error for s in samples if s.error})
+    if errors:
+        summary["error_messages"] = errors[:5]
+    return summary
+
+
+# --- Scenarios ---
+
+def crew_job(topic: str, notes: str) -> Callable[[int], Sample]:
+    """SmartStudyCrew.run in-process (no HTTP, no queue)"""
+    from src.crew import SmartStudyCrew
+
+    def job(i: int) -> Sample:
+        started = time.monotonic()
+        try:
+            SmartStudyCrew(f"{topic} #{i}", notes).run()
+            return Sample(time.monotonic() - started, ok=True)
+        except Exception as e:
+            return Sample(time.monotonic() - started, ok=False, error=str(e)[:200])
+    return job
+
+
+def stream_job(base_url: str, topic: str, notes: str, timeout: float) -> Callable[[int], Sample]:
+    """POST /generate-plan and read the SSE stream to the end"""
+
+    def job(i: int) -> Sample:
+        body = {"topic": f"{topic} #{i}", "notes": notes, "force_refresh": True}
+        headers = {"X-Client-Id": f"bench-{i}"}  # one client per run, so queue fairness does not throttle
+        started = time.monotonic()
+        ttfb = first_delta = first_section = None
+        error = ""
+        try:
+            with httpx.stream("POST", f"{base_url}/generate-plan", json=body, headers=headers, timeout=timeout) as response:
+                if response.status_code != 200:
+                    return Sample(time.monotonic() - started, ok=False, error=f"HTTP {response.status_code}")
+                for line in response.iter_lines():
+                    now = time.monotonic() - started
+                    if ttfb is None:
+                        ttfb = now
+                    if line == "event: delta" and first_delta is None:
+                        first_delta = now
+                    elif line == "event: section" and first_section is None:
+                        first_section = now
+                    elif line == "event: error":
+                        error = "crew run failed"
+                    elif line == "event: done":
+                        break
+        except httpx.HTTPError as e:
+            error = str(e)[:200]
+        return Sample(time.monotonic() - started, ok=not error, ttfb=ttfb, first_delta=first_delta,
+                      first_section=first_section, error=error)
+    return job
+
+
+def upload_job(base_url: str, files: List[Path], timeout: float) -> Callable[[int], Sample]:
+    """POST /upload with corpus files in turn"""
+
+    def job(i: int) -> Sample:
+        path = files[i % len(files)]
+        started = time.monotonic()
+        try:
+            with open(path, "rb") as f:
+                response = httpx.post(f"{base_url}/upload", files={"file": (path.name, f)}, timeout=timeout)
+            data = response.json()
+            ok = response.status_code == 200 and not data.get("error")
+            return Sample(time.monotonic() - started, ok=ok, error="" if ok else str(data.get("error"))[:200])
+        except (httpx.HTTPError, ValueError) as e:
+            return Sample(time.monotonic() - started, ok=False, error=str(e)[:200])
+    return job
+
+
+class LocalServer:
+    """The FastAPI app under uvicorn on a free localhost port, in a background thread"""
+
+    def __init__(self, app):
+        import uvicorn
+
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, name="bench-server", daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self) -> "LocalServer":
+        self.thread.start()
+        deadline = time.monotonic() + 30
+        while not self.server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError("Benchmark server did not start")
+            time.sleep(0.05)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
+
+
+# --- Baseline ---
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Human-readable regressions beyond `tolerance` (0.1 = 10%) against a saved run"""
+    regressions = []
+    for scenario, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(scenario)
+        if not previous:
+            continue
+        for key in LOWER_IS_BETTER + HIGHER_IS_BETTER:
+            old, new = previous.get(key), current.get(key)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = change > tolerance if key in LOWER_IS_BETTER else change < -tolerance
+            if worse:
+                regressions.append(f"{scenario}.{key}: {old} -> {new} ({change:+.0%})")
+        if current["errors"] > previous.get("errors", 0):
+            regressions.append(f"{scenario}.errors: {previous.get('errors', 0)} -> {current['errors']}")
+    return regressions
+
+
+def format_report(results: Dict) -> str:
+    def seconds(value) -> str:
+        return "-" if value is None else f"{value:.3f}s"
+
+    lines = []
+    for scenario, s in results["scenarios"].items():
+        lines.append(
+            f"{scenario:<7} runs={s['runs']} errors={s['errors']} c={s['concurrency']}  "
+            f"p50={seconds(s['p50'])} p95={seconds(s['p95'])} p99={seconds(s['p99'])}  "
+            f"ttfb_p50={seconds(s.get('ttfb_p50'))} first_delta_p95={seconds(s.get('first_delta_p95'))}  runs/min={s['runs_per_min']}"
+        )
+        if s.get("error_messages"):
+            lines.append(f"        first error: {s['error_messages'][0][:160]!r}")
+    rss = results["peak_rss_mb"]
+    lines.append(f"peak RSS: {rss['self']} MB (extraction workers: {rss['children']} MB)")
+    lines.append(f"fake backend: {results['backend']}")
+    return "\n".join(lines)
+
+
+def load_json(path: Path) -> Dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_json(path: Path, data: Dict):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
@@ -1,42 +1,40 @@
-import sys
-import io
-import queue
-import threading
 import asyncio
 import json
-import re
 import os
+import uuid
+from pathlib import Path
 from fastapi import FastAPI, Request, UploadFile, File, Form, HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from dotenv import load_dotenv
 
-# Document parsers
-import pypdf
-from docx import Document
-from pptx import Presentation
-
-from src.crew import SmartStudyCrew
+# CrewAI / LangChain / Gemini and the document parsers are not imported here:
+# they load in the background warm-up (src/warmup.py) or on first use
+from src.session_manager import session_manager
+from src.memory_index import memory_index
+from src.plan_registry import plan_registry
+from src.job_queue import crew_queue, QueueFullError
+from src.extraction import save_upload, extract_pages, ExtractionError
+from src.material_store import material_store
+from src.retrieval import material_index
+from src.streaming import RunChannel, stream_session, sse_events, emit_event
 from src.config.settings import settings
+from src.rate_limiter import quota_scheduler
+from src.llm_cache import response_cache
+from src.search_client import search_client
+from src.metrics import metrics, phase
+from src.warmup import warmup, loaded_module
 
 load_dotenv()
 
-# Use Key 2 as primary because Key 1 is known to be exhausted until Feb 13
-api_key_primary = os.getenv("GOOGLE_API_KEY_2") or os.getenv("GOOGLE_API_KEY")
-
 # CRITICAL: Disable OpenAI and LiteLLM noise
 os.environ["OPENAI_API_KEY"] = "none"
 os.environ["LITELLM_LOGGING"] = "False"
 os.environ["LITELLM_MODE"] = "native"
 os.environ["OTEL_SDK_DISABLED"] = "true"
 
-
-if api_key_primary:
-    os.environ["GEMINI_API_KEY"] = api_key_primary
-    os.environ["GOOGLE_API_KEY"] = api_key_primary
-
 # Disable all tracking and telemetry
 os.environ["CREWAI_SKIP_TELEMETRY"] = "true"
 os.environ["CREWAI_TRACING_ENABLED"] = "false"
@@ -57,109 +55,263 @@ app.add_middleware(
 class StudyRequest(BaseModel):
     topic: str
     notes: str = ""
-
-# Regex to strip ANSI color codes for clean frontend logs
-ANSI_ESCAPE = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
-
-class QueueWriter(io.TextIOBase):
-    def __init__(self, q):
-        self.q = q
-    def write(self, data):
-        if data:
-            clean_data = ANSI_ESCAPE.sub('', data)
-            if clean_data.strip():
-                self.q.put(clean_data)
+    material_ids: List[str] = []  # sha256 of uploads the notes came from (scopes retrieval)
+    base_session_id: Optional[str] = None  # earlier session to refine: unchanged tasks are reused
+    force_refresh: bool = False
 
 @app.post("/upload")
 async def upload_file(file: UploadFile = File(...)):
     """Handles document uploads (PDF, DOCS, PPTX, TXT, MD) and extracts text"""
     try:
-        content = await file.read()
-        filename = file.filename.lower()
-        
-        # Save file to materials directory
-        save_path = settings.output_dir / "materials" / filename
-        with open(save_path, "wb") as f:
-            f.write(content)
-            
-        extracted_text = ""
-
-        if filename.endswith('.pdf'):
-            try:
-                reader = pypdf.PdfReader(io.BytesIO(content))
-                for page in reader.pages:
-                    extracted_text += page.extract_text() + "\n"
-            except Exception as e:
-                print(f"PDF extract error: {e}")
-        
-        elif filename.endswith('.docx') or filename.endswith('.doc'):
-            try:
-                doc = Document(io.BytesIO(content))
-                for para in doc.paragraphs:
-                    extracted_text += para.text + "\n"
-            except Exception as e:
-                print(f"DOCX extract error: {e}")
+        filename = Path(file.filename).name
         
-        elif filename.endswith('.pptx'):
-            try:
-                prs = Presentation(io.BytesIO(content))
-                for slide in prs.slides:
-                    for shape in slide.shapes:
-                        if hasattr(shape, "text"):
-                            extracted_text += shape.text + "\n"
-            except Exception as e:
-                 print(f"PPTX extract error: {e}")
-        
-        elif filename.endswith('.txt') or filename.endswith('.md'):
-            extracted_text = content.decode('utf-8', errors='ignore')
-            
+        # Stream to a scratch file, hashing as we go
+        upload_path = material_store.incoming_dir / f"{uuid.uuid4().hex}{Path(filename).suffix.lower()}"
+        with phase("upload_save"):
+            _, digest = await save_upload(file, upload_path, settings.max_upload_mb * 1024 * 1024)
+
+        # Same bytes uploaded before: reuse the stored extraction
+        record = material_store.lookup(digest)
+        if record is not None:
+            upload_path.unlink(missing_ok=True)
+            cached = True
         else:
-             # Fallback try text decode
-            extracted_text = content.decode('utf-8', errors='ignore')
+            try:
+                with phase("upload_extract"):
+                    pages = await extract_pages(upload_path)
+            except Exception:
+                # Failures are never stored, so the same bytes are extracted again next time
+                upload_path.unlink(missing_ok=True)
+                raise
+            with phase("upload_store"):
+                record = await asyncio.to_thread(material_store.store, digest, upload_path, filename, pages)
+            cached = False
+
+        # Incremental: only bytes not seen before are split and indexed
+        with phase("upload_index"):
+            await asyncio.to_thread(material_index.add_material, record)
 
-        return {"text": extracted_text.strip(), "filename": file.filename, "saved_path": str(save_path)}
+        return {
+            "text": record["text"].strip(),
+            "filename": file.filename,
+            "saved_path": record["source_path"],
+            "sha256": digest,
+            "page_count": record["page_count"],
+            "cached": cached
+        }
 
+    except ExtractionError as e:
+        return JSONResponse(status_code=e.status_code, content={"error": str(e), "text": ""})
     except Exception as e:
         print(f"Upload error: {e}")
         return {"error": f"Failed to process file: {str(e)}", "text": ""}
 
+def replay_plan(session_id: str) -> Optional[RunChannel]:
+    """Stream a stored report for a duplicate request instead of running a new crew"""
+    if not session_manager.exists(session_id):
+        return None
+    memory = session_manager.get(session_id)
+    report_text = memory.get_final_report()
+    if report_text is None:
+        return None
+
+    replay = RunChannel()
+    replay.put(f"[PLAN_CACHE] Identical request already answered in session {session_id}. Replaying stored report.\n")
+    replay.publish("final_report", {"markdown": report_text})
+    replay.publish("memory_summary", {"text": memory.get_context_summary()})
+    replay.close()
+    return replay
+
+def client_id_for(http_request: Request) -> str:
+    """Identify the submitter for per-client queue fairness"""
+    return http_request.headers.get("X-Client-Id") or (http_request.client.host if http_request.client else "anonymous")
+
+def enqueue_run(http_request: Request, request: StudyRequest, fingerprint: str, channel: RunChannel,
+                session_id: Optional[str] = None) -> Optional[dict]:
+    """Admit a crew run to the queue; returns the queue greeting (None = starts now)"""
+    try:
+        position = crew_queue.submit(client_id_for(http_request), run_crew, request, fingerprint, channel, session_id)
+    except QueueFullError as e:
+        plan_registry.finish(fingerprint)
+        channel.close()
+        raise HTTPException(
+            status_code=e.status_code,
+            detail={"error": str(e), "queue_position": e.position, "eta_seconds": round(e.eta_seconds)},
+            headers={"Retry-After": str(max(1, round(e.eta_seconds)))}
+        )
+    if position:
+        return {"event": "queue", "data": {"position": position, "eta_seconds": round(crew_queue.eta_for(position))}}
+    return None
+
 @app.post("/generate-plan")
-async def generate_plan(request: StudyRequest):
-    log_queue = queue.Queue()
-    result_queue = queue.Queue()
-    
-    def run_crew():
-        sys.stdout = QueueWriter(log_queue)
-        try:
-            crew = SmartStudyCrew(request.topic, request.notes)
-            result, memory = crew.run()
-            
-            # Send final report with memory summary
-            report_text = str(result)
-            memory_summary = memory.get_context_summary()
-            
-            print(f"\n[FINAL_REPORT]\n{report_text}")
-            print(f"\n[MEMORY_SUMMARY]\n{memory_summary}")
-            
-        except Exception as e:
-            print(f"Error during mission: {str(e)}")
-        finally:
-            sys.stdout = sys.__stdout__
-            log_queue.put(None)
-
-    threading.Thread(target=run_crew).start()
-
-    async def stream_generator():
-        while True:
+async def generate_plan(request: StudyRequest, http_request: Request):
+    fingerprint = plan_registry.fingerprint(request.topic, request.notes, request.material_ids)
+    channel = None
+    greeting = None
+
+    # 1. Finished duplicate: replay it from StudyMemory
+    if not request.force_refresh:
+        session_id = plan_registry.finished_session(fingerprint)
+        if session_id:
+            channel = replay_plan(session_id)
+            if channel is None:
+                plan_registry.forget(fingerprint)
+
+    # 2. Running duplicate: attach to its stream; otherwise start a new crew
+    if channel is None:
+        channel, is_new = plan_registry.attach_or_start(fingerprint)
+        if is_new:
+            greeting = enqueue_run(http_request, request, fingerprint, channel)
+        else:
+            greeting = {"event": "log", "data": {"text": "[PLAN_CACHE] Identical request already running. Attaching to its live stream.\n"}}
+
+    return StreamingResponse(
+        sse_events(channel, greeting),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def run_crew(request: StudyRequest, fingerprint: str, channel: RunChannel, session_id: Optional[str] = None):
+    finished_session = None
+    try:
+        # Only output printed by this run (and its task threads) reaches this channel
+        with stream_session(channel):
+            crew = None
             try:
-                chunk = await asyncio.to_thread(log_queue.get, timeout=2.0)
-                if chunk is None: break
-                yield chunk
-            except queue.Empty:
-                await asyncio.sleep(0.1)
-                continue
-
-    return StreamingResponse(stream_generator(), media_type="text/plain")
+                from src.crew import SmartStudyCrew  # no-op once warm-up has imported it
+
+                crew = SmartStudyCrew(
+                    request.topic, request.notes,
+                    session_id=session_id,
+                    material_ids=request.material_ids,
+                    base_session_id=request.base_session_id
+                )
+                crew.memory.set_session_context(request.topic, request.notes, {
+                    "request_fingerprint": fingerprint,
+                    "material_ids": request.material_ids
+                })
+                emit_event("session", {"session_id": crew.session_id})
+                with session_manager.active(crew.session_id):
+                    result, memory = crew.run()
+
+                # Send final report with memory summary
+                emit_event("final_report", {"markdown": str(result)})
+                emit_event("memory_summary", {"text": memory.get_context_summary()})
+                finished_session = crew.session_id
+
+            except Exception as e:
+                print(f"Error during mission: {str(e)}")
+                # Completed tasks are checkpointed; the client can POST /resume/<session_id>
+                emit_event("error", {"message": str(e), "session_id": crew.session_id if crew else None})
+    except Exception as e:
+        # Log capture itself failed; the client still gets an error instead of endless heartbeats
+        print(f"Error during mission setup: {str(e)}")
+        channel.publish("error", {"message": str(e), "session_id": None})
+    finally:
+        # Always release the fingerprint, so identical requests never attach to a dead channel
+        plan_registry.finish(fingerprint, finished_session)
+        channel.close()
+
+@app.post("/resume/{session_id}")
+async def resume_plan(session_id: str, http_request: Request):
+    """Finish an interrupted run, re-running only tasks without a checkpoint"""
+    if not session_manager.exists(session_id):
+        raise HTTPException(status_code=404, detail={"error": f"Unknown session {session_id}"})
+    memory = session_manager.get(session_id)
+    channel = replay_plan(session_id)
+    greeting = None
+
+    if channel is None:
+        context = memory.context
+        metadata = context.get("metadata", {})
+        request = StudyRequest(
+            topic=context.get("topic", ""),
+            notes=context.get("notes", ""),
+            material_ids=metadata.get("material_ids", [])
+        )
+        fingerprint = metadata.get("request_fingerprint") or plan_registry.fingerprint(request.topic, request.notes, request.material_ids)
+        channel, is_new = plan_registry.attach_or_start(fingerprint)
+        if is_new:
+            greeting = enqueue_run(http_request, request, fingerprint, channel, session_id)
+
+    return StreamingResponse(
+        sse_events(channel, greeting),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/quota")
+async def quota_status():
+    """Current LLM quota headroom, admission queue depth and pool health per API key"""
+    agents = loaded_module("src.agents")  # pool health is only known once the LLM stack is loaded
+    return {**quota_scheduler.stats(), "pool": agents.llm_pool.stats() if agents else [], "crew_queue": crew_queue.stats()}
+
+@app.get("/memory/search")
+async def search_memory(
+    q: str = "",
+    agent: Optional[str] = None,
+    topic: Optional[str] = None,
+    kind: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    limit: int = 20,
+    offset: int = 0
+):
+    """Full-text search over agent outputs and conversation turns of all sessions"""
+    limit = max(1, min(limit, 100))
+    try:
+        return await asyncio.to_thread(
+            memory_index.search, q, agent=agent, topic=topic, kind=kind,
+            since=since, until=until, limit=limit, offset=max(0, offset), include_content=False
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail={"error": str(e)})
+
+@app.on_event("startup")
+async def start_warmup():
+    """Create output dirs, then load the heavy stacks after the port is bound"""
+    settings.create_dirs()
+    warmup.start()
+
+@app.get("/ready")
+async def readiness():
+    """503 until the background warm-up has finished (for load balancer / autoscaler probes)"""
+    status = warmup.status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
+@app.on_event("startup")
+async def backfill_memory_index():
+    """Index sessions stored before the search index existed, off the request path"""
+    asyncio.get_running_loop().run_in_executor(None, memory_index.backfill)
+
+@app.on_event("startup")
+async def start_session_sweeper():
+    session_manager.start_sweeper()
+
+@app.get("/sessions/stats")
+async def session_stats():
+    """Stored, cached, running and archived session counts"""
+    return await asyncio.to_thread(session_manager.stats)
+
+@app.get("/sessions/{session_id}/timings")
+async def session_timings(session_id: str):
+    """Where the session's latest run spent its time (per agent, tool and phase)"""
+    if not session_manager.exists(session_id):
+        raise HTTPException(status_code=404, detail={"error": f"Unknown session {session_id}"})
+    timings = session_manager.get(session_id).get_timings()
+    if timings is None:
+        raise HTTPException(status_code=404, detail={"error": f"No timings recorded for {session_id}"})
+    return timings
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """LLM, task, tool, cache and upload-phase histograms in the Prometheus text format"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """LLM response and academic search cache hit/miss counters"""
+    return {**response_cache.stats(), "search": search_client.stats()}
 
 if __name__ == "__main__":
     import uvicorn
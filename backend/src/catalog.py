@@ -0,0 +1,211 @@
+import argparse
+import csv
+import gzip
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from .config.settings import settings
+from .retrieval import BM25Index
+
+RECORDS_FILE = "records.jsonl.gz"
+INDEX_FILE = "index.npz"
+# Names the live version directory; records and postings are swapped in together
+CURRENT_FILE = "CURRENT"
+JSON_SEPARATORS = re.compile(r"[\s,]*")
+
+
+def normalize_record(raw: Dict, source: str = "") -> Optional[Dict]:
+    """Map a dump row (catalog JSONL/CSV or the arXiv metadata snapshot) to a catalog record"""
+    title = " ".join(str(raw.get("title") or "").split())
+    url = raw.get("url") or raw.get("link")
+    if not url and raw.get("id") and raw.get("abstract") is not None:
+        url = f"https://arxiv.org/abs/{raw['id']}"  # arXiv metadata snapshot
+    if not title or not url:
+        return None
+    description = " ".join(str(raw.get("description") or raw.get("abstract") or "").split())
+    return {
+        "title": title,
+        "url": url,
+        "description": description[:600],
+        "type": raw.get("type") or ("paper" if "arxiv.org" in url else "course"),
+        "source": raw.get("source") or source,
+        "subjects": raw.get("subjects") or raw.get("categories") or "",
+    }
+
+
+def iter_json_values(f, chunk_size: int = 1 << 20) -> Iterator:
+    """
+    Top-level values of a JSON array or of JSON Lines / concatenated JSON,
+    decoded incrementally so multi-GB dumps never sit in memory at once.
+    """
+    decoder = json.JSONDecoder()
+    buffer, pos, eof = "", 0, False
+    in_array = None
+    while True:
+        pos = JSON_SEPARATORS.match(buffer, pos).end()
+        if in_array is None and pos < len(buffer):
+            # First non-space character tells an array from JSON Lines
+            in_array = buffer[pos] == "["
+            pos += 1 if in_array else 0
+            continue
+        if in_array and buffer.startswith("]", pos):
+            return
+        if pos < len(buffer):
+            try:
+                value, pos = decoder.raw_decode(buffer, pos)
+                yield value
+                continue
+            except ValueError:
+                if eof:
+                    raise
+        elif eof:
+            return
+        chunk = f.read(chunk_size)
+        eof = not chunk
+        buffer, pos = buffer[pos:] + chunk, 0
+
+
+def read_dump(path: Path) -> Iterator[Dict]:
+    """Rows of a .jsonl / .json / .csv dump (optionally .gz)"""
+    name = path.name.lower()
+    opener = gzip.open if name.endswith(".gz") else open
+    name = name[:-3] if name.endswith(".gz") else name
+    with opener(path, "rt", encoding="utf-8") as f:
+        if name.endswith(".csv"):
+            yield from csv.DictReader(f)
+        elif name.endswith(".json"):
+            # Either an array or, like the arXiv snapshot, one object per line
+            yield from iter_json_values(f)
+        else:
+            yield from (json.loads(line) for line in f if line.strip())
+
+
+def record_text(record: Dict) -> str:
+    subjects = record["subjects"] if isinstance(record["subjects"], str) else " ".join(record["subjects"])
+    return f"{record['title']} {record['title']} {subjects} {record['description']}"
+
+
+class ResourceCatalog:
+    """
+    Prebuilt, offline catalog of open educational resources.
+    Records live in a gzipped JSONL file and the BM25 postings in CSR NumPy
+    arrays (index.npz), so loading is a couple of array reads and a lookup
+    never touches the network. Each build writes both into a new version
+    directory and then atomically repoints CURRENT at it, so a reader never
+    pairs new records with old postings; readers reload when CURRENT changes.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self._index: Optional[BM25Index] = None
+        self._loaded_version = ""
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, config) -> "ResourceCatalog":
+        return cls(Path(config.catalog_dir) if config.catalog_dir else config.output_dir / "catalog")
+
+    def _current_version(self) -> Optional[str]:
+        try:
+            return (self.root / CURRENT_FILE).read_text(encoding="utf-8").strip() or None
+        except OSError:
+            return None
+
+    def _load_records(self, version: Optional[str]) -> List[Dict]:
+        path = self.root / version / RECORDS_FILE if version else None
+        if path is None or not path.exists():
+            return []
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def index(self) -> Optional[BM25Index]:
+        version = self._current_version()
+        if version is None:
+            return None
+        with self._lock:
+            if self._index is None or version != self._loaded_version:
+                with np.load(self.root / version / INDEX_FILE) as arrays:
+                    self._index = BM25Index.from_arrays(dict(arrays), self._load_records(version))
+                self._loaded_version = version
+            return self._index
+
+    def search(self, query: str, k: int = 5, resource_type: Optional[str] = None) -> List[Dict]:
+        index = self.index()
+        if index is None:
+            return []
+        hits = index.search(query, k * 4 if resource_type else k)
+        results = [r for _, r in hits if not resource_type or r["type"] == resource_type]
+        return results[:k]
+
+    def build(self, dumps: List[Path], source: str = "", replace: bool = False) -> int:
+        """Ingest dumps (merged with the current catalog unless replace) into a new catalog version"""
+        records: Dict[str, Dict] = {}
+        previous = self._current_version()
+        if not replace:
+            records = {r["url"]: r for r in self._load_records(previous)}
+        for dump in dumps:
+            for raw in read_dump(dump):
+                record = normalize_record(raw, source or dump.stem)
+                if record:
+                    records[record["url"]] = record
+
+        ordered = list(records.values())
+        index = BM25Index()
+        index.add({"text": record_text(r)} for r in ordered)
+
+        version = f"v{time.time_ns()}"
+        version_dir = self.root / version
+        version_dir.mkdir(parents=True)
+        with gzip.open(version_dir / RECORDS_FILE, "wt", encoding="utf-8") as f:
+            for record in ordered:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        np.savez_compressed(version_dir / INDEX_FILE, **index.to_arrays())
+
+        tmp_current = self.root / (CURRENT_FILE + ".tmp")
+        tmp_current.write_text(version, encoding="utf-8")
+        os.replace(tmp_current, self.root / CURRENT_FILE)
+        # The previous version stays for readers still loading it; older ones go
+        for old in self.root.glob("v*"):
+            if old.is_dir() and old.name not in (version, previous):
+                shutil.rmtree(old, ignore_errors=True)
+        return len(ordered)
+
+    def stats(self) -> Dict:
+        index = self.index()
+        return {"root": str(self.root), "records": len(index) if index else 0}
+
+
+# Singleton instance
+resource_catalog = ResourceCatalog.from_settings(settings)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog="python -m src.catalog", description="Offline resource catalog")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="ingest .jsonl/.json/.csv dumps (optionally gzipped)")
+    build.add_argument("dumps", nargs="+", type=Path)
+    build.add_argument("--source", default="", help="source label for records without one (default: file name)")
+    build.add_argument("--replace", action="store_true", help="start from an empty catalog")
+    search = commands.add_parser("search", help="query the built catalog")
+    search.add_argument("query")
+    search.add_argument("-k", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        count = resource_catalog.build(args.dumps, source=args.source, replace=args.replace)
+        print(f"[CATALOG] {count} resources indexed in {resource_catalog.root}")
+    else:
+        for record in resource_catalog.search(args.query, args.k):
+            print(f"- [{record['type']}] {record['title']} <{record['url']}>")
+
+
+if __name__ == "__main__":
+    main()
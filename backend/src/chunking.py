@@ -0,0 +1,64 @@
+import re
+from typing import List, Optional
+
+from .rate_limiter import estimate_tokens
+
+# Markdown headings and "Chapter 3" / "Section 2.1" style lines start a new section
+HEADING_PATTERN = re.compile(r'^(?:#{1,6}\s+\S|(?:chapter|section|lecture|unit)\s+\d)', re.IGNORECASE | re.MULTILINE)
+
+
+def split_sections(text: str, page_offsets: Optional[List[int]] = None) -> List[str]:
+    """Cut text at page boundaries (when offsets are known) and at headings"""
+    cuts = {0, len(text)}
+    if page_offsets:
+        cuts.update(o for o in page_offsets if 0 < o < len(text))
+    cuts.update(m.start() for m in HEADING_PATTERN.finditer(text) if m.start() > 0)
+    bounds = sorted(cuts)
+    sections = [text[a:b] for a, b in zip(bounds, bounds[1:])]
+    return [s for s in sections if s.strip()]
+
+
+SEPARATORS = ("\n\n", "\n", " ")
+
+
+def _split_oversized(section: str, max_tokens: int, level: int = 0) -> List[str]:
+    """Break a section that alone exceeds the budget on paragraphs, then lines, then words"""
+    if estimate_tokens(section) <= max_tokens:
+        return [section]
+    for i in range(level, len(SEPARATORS)):
+        separator = SEPARATORS[i]
+        pieces = section.split(separator)
+        if len(pieces) > 1:
+            pieces = [p + separator for p in pieces[:-1]] + [pieces[-1]]
+            out: List[str] = []
+            for piece in pieces:
+                out.extend(_split_oversized(piece, max_tokens, i + 1))
+            return out
+    max_chars = max_tokens * 4
+    return [section[i:i + max_chars] for i in range(0, len(section), max_chars)]
+
+
+def _pack(parts: List[str], max_tokens: int) -> List[str]:
+    """Greedily merge consecutive pieces into chunks that stay within the budget"""
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    for part in parts:
+        for piece in _split_oversized(part, max_tokens):
+            tokens = estimate_tokens(piece)
+            if current and current_tokens + tokens > max_tokens:
+                chunks.append("".join(current))
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += tokens
+    if current:
+        chunks.append("".join(current))
+    return chunks
+
+
+def chunk_text(text: str, max_tokens: int, page_offsets: Optional[List[int]] = None) -> List[str]:
+    """Token-budgeted chunks that respect page and heading boundaries where possible"""
+    if estimate_tokens(text) <= max_tokens:
+        return [text]
+    return [c for c in _pack(split_sections(text, page_offsets), max_tokens) if c.strip()]
+
@@ -1,15 +1,100 @@
 from pydantic_settings import BaseSettings
 from pydantic import Field, field_validator
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 import os
 
 class Settings(BaseSettings):
     """Production configuration with validation"""
     google_api_key: str = Field(default="", alias="GOOGLE_API_KEY")
+    google_api_key_2: str = Field(default="", alias="GOOGLE_API_KEY_2")
+    # Comma-separated; when set, replaces GOOGLE_API_KEY / GOOGLE_API_KEY_2
+    google_api_keys: str = Field(default="", alias="GOOGLE_API_KEYS")
+    # Comma-separated; the first model serves group A agents, the last serves group B
+    llm_model_names: str = Field(default="gemini-2.5-flash-lite", alias="LLM_MODELS")
     output_dir: Path = Field(default=Path("./outputs"), alias="OUTPUT_DIR")
     log_level: str = Field(default="INFO", alias="LOG_LEVEL")
     model_name: str = "gemini/gemini-2.0-flash" 
+
+    # Startup (heavy stacks load in a background warm-up after the port is bound)
+    warmup_enabled: bool = Field(default=True, alias="WARMUP_ENABLED")
+
+    # Crew execution
+    config_hot_reload: bool = Field(default=True, alias="CONFIG_HOT_RELOAD")  # re-read agents/tasks YAML on change
+    execution_mode: str = Field(default="parallel", alias="EXECUTION_MODE")
+    max_parallel_tasks: int = Field(default=5, alias="MAX_PARALLEL_TASKS")
+    max_tasks_per_llm_group: int = Field(default=2, alias="MAX_TASKS_PER_LLM_GROUP")
+
+    # Crew run admission control
+    crew_workers: int = Field(default=2, alias="CREW_WORKERS")
+    crew_queue_max: int = Field(default=20, alias="CREW_QUEUE_MAX")
+    crew_queue_per_client: int = Field(default=3, alias="CREW_QUEUE_PER_CLIENT")
+    crew_expected_seconds: float = Field(default=120.0, alias="CREW_EXPECTED_SECONDS")
+
+    # Per-session log streaming
+    log_flush_interval: float = Field(default=0.25, alias="LOG_FLUSH_INTERVAL")
+    log_max_buffer: int = Field(default=4096, alias="LOG_MAX_BUFFER")
+    sse_heartbeat_seconds: float = Field(default=15.0, alias="SSE_HEARTBEAT_SECONDS")
+    stream_max_pending_logs: int = Field(default=500, alias="STREAM_MAX_PENDING_LOGS")
+    llm_stream_deltas: bool = Field(default=True, alias="LLM_STREAM_DELTAS")  # stream agent answers as `delta` events
+
+    # Upload extraction
+    max_upload_mb: int = Field(default=50, alias="MAX_UPLOAD_MB")
+    max_pdf_pages: int = Field(default=1000, alias="MAX_PDF_PAGES")
+    pdf_pages_per_job: int = Field(default=25, alias="PDF_PAGES_PER_JOB")
+    extraction_workers: int = Field(default=0, alias="EXTRACTION_WORKERS")  # 0 = min(4, CPUs)
+    materials_max_mb: int = Field(default=2048, alias="MATERIALS_MAX_MB")
+
+    # Shared LLM quota (per API key and model; defaults match the Gemini free tier)
+    llm_rpm: int = Field(default=15, alias="LLM_RPM")
+    llm_tpm: int = Field(default=250000, alias="LLM_TPM")
+    llm_rpd: int = Field(default=1000, alias="LLM_RPD")
+    llm_max_retries: int = Field(default=6, alias="LLM_MAX_RETRIES")
+    llm_backoff_base: float = Field(default=2.0, alias="LLM_BACKOFF_BASE")
+    llm_backoff_max: float = Field(default=60.0, alias="LLM_BACKOFF_MAX")
+
+    # LLM response cache (memory LRU + on-disk store under output_dir/cache/llm)
+    llm_cache_enabled: bool = Field(default=True, alias="LLM_CACHE_ENABLED")
+    llm_cache_max_entries: int = Field(default=256, alias="LLM_CACHE_MAX_ENTRIES")
+    llm_cache_max_disk_entries: int = Field(default=5000, alias="LLM_CACHE_MAX_DISK_ENTRIES")
+    llm_cache_ttl_seconds: int = Field(default=7 * 86400, alias="LLM_CACHE_TTL_SECONDS")
+
+    # Long notes (map-reduce condensing once they exceed the prompt budget)
+    notes_token_budget: int = Field(default=6000, alias="NOTES_TOKEN_BUDGET")
+    summary_chunk_tokens: int = Field(default=3000, alias="SUMMARY_CHUNK_TOKENS")
+    summary_max_parallel: int = Field(default=4, alias="SUMMARY_MAX_PARALLEL")
+    summary_reduce_fan_in: int = Field(default=4, alias="SUMMARY_REDUCE_FAN_IN")
+
+    # Retrieval over uploaded materials (BM25, optional sentence-transformers model)
+    retrieval_passage_tokens: int = Field(default=200, alias="RETRIEVAL_PASSAGE_TOKENS")
+    retrieval_top_k: int = Field(default=4, alias="RETRIEVAL_TOP_K")
+    retrieval_embedding_model: str = Field(default="", alias="RETRIEVAL_EMBEDDING_MODEL")
+
+    # Session memory persistence (append-only JSONL segments, group-committed)
+    memory_flush_interval: float = Field(default=0.05, alias="MEMORY_FLUSH_INTERVAL")
+    memory_segment_max_kb: int = Field(default=1024, alias="MEMORY_SEGMENT_MAX_KB")
+    memory_max_segments: int = Field(default=8, alias="MEMORY_MAX_SEGMENTS")
+    memory_fsync: bool = Field(default=False, alias="MEMORY_FSYNC")
+
+    # Session retention (older sessions are archived to memory/archive)
+    session_ttl_days: float = Field(default=30.0, alias="SESSION_TTL_DAYS")
+    session_max_count: int = Field(default=1000, alias="SESSION_MAX_COUNT")
+    session_max_mb: int = Field(default=1024, alias="SESSION_MAX_MB")
+    session_archive: bool = Field(default=True, alias="SESSION_ARCHIVE")
+    session_cache_size: int = Field(default=32, alias="SESSION_CACHE_SIZE")
+    session_sweep_seconds: float = Field(default=600.0, alias="SESSION_SWEEP_SECONDS")
+
+    # Academic search (shared arXiv client with an on-disk result cache)
+    search_max_results: int = Field(default=3, alias="SEARCH_MAX_RESULTS")
+    search_cache_max_entries: int = Field(default=1000, alias="SEARCH_CACHE_MAX_ENTRIES")
+    search_cache_ttl_seconds: int = Field(default=86400, alias="SEARCH_CACHE_TTL_SECONDS")
+    arxiv_delay_seconds: float = Field(default=3.0, alias="ARXIV_DELAY_SECONDS")
+    arxiv_timeout_seconds: float = Field(default=10.0, alias="ARXIV_TIMEOUT_SECONDS")  # per HTTP request
+    search_timeout_seconds: float = Field(default=30.0, alias="SEARCH_TIMEOUT_SECONDS")  # caller's wait for results
+
+    # Offline resource catalog (built with `python -m src.catalog build`)
+    catalog_dir: str = Field(default="", alias="CATALOG_DIR")  # empty = <output_dir>/catalog
+    catalog_top_k: int = Field(default=5, alias="CATALOG_TOP_K")
     
     class Config:
         env_file = ".env"
@@ -29,6 +114,26 @@ class Settings(BaseSettings):
         if v.upper() not in valid:
             raise ValueError(f"Invalid log level. Must be one of {valid}")
         return v.upper()
+
+    @field_validator("execution_mode")
+    @classmethod
+    def validate_execution_mode(cls, v):
+        valid = ["parallel", "sequential"]
+        if v.lower() not in valid:
+            raise ValueError(f"Invalid execution mode. Must be one of {valid}")
+        return v.lower()
+    
+    def api_keys(self) -> List[str]:
+        """All configured Gemini keys, de-duplicated, in priority order"""
+        raw = self.google_api_keys.split(",") if self.google_api_keys else [self.google_api_key, self.google_api_key_2]
+        keys = []
+        for key in (k.strip() for k in raw):
+            if key and key not in keys:
+                keys.append(key)
+        return keys
+
+    def llm_models(self) -> List[str]:
+        return [m.strip() for m in self.llm_model_names.split(",") if m.strip()]
     
     def create_dirs(self):
         """Ensure output directories exist"""
@@ -36,7 +141,8 @@ class Settings(BaseSettings):
         (self.output_dir / "memory").mkdir(exist_ok=True)
         (self.output_dir / "materials").mkdir(exist_ok=True)
         (self.output_dir / "summaries").mkdir(exist_ok=True)
+        (self.output_dir / "cache").mkdir(exist_ok=True)
+        (self.output_dir / "index").mkdir(exist_ok=True)
 
-# Singleton instance
+# Singleton instance (output directories are created at server startup, see main.py)
 settings = Settings()
-settings.create_dirs()
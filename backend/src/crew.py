@@ -1,4 +1,5 @@
 from crewai import Crew, Process
+from crewai.tasks.task_output import TaskOutput
 from .agents import (
     create_summarizer_agent, 
     create_scheduler_agent, 
@@ -6,32 +7,94 @@ from .agents import (
     create_quiz_generator_agent, 
     create_progress_tracker_agent, 
     create_coordinator_agent,
+    llm_group_a,
     llm_group_b,
-    quality_llm
+    quality_llm,
+    llm_pool
 )
 from .tasks import SmartStudyTasks
 from .config.settings import settings
-from .memory import StudyMemory
+from .session_manager import session_manager
+from .executor import TaskGraphExecutor
+from .streaming import emit_event
+from .summarization import condense_notes
+from .retrieval import task_passages
+from .material_store import material_store
+from .tools import MaterialSearchTool
+from .chunking import chunk_text
+from .plan_registry import PlanRegistry
+from .metrics import agent_scope, phase, track_run
 
-import time
+import hashlib
+import json
 import uuid
 
+# Dashboard section each specialist's output fills (the coordinator sends the full report)
+SECTION_BY_AGENT = {
+    "Note Summarizer": "summary",
+    "Study Scheduler": "schedule",
+    "Resource Finder": "resources",
+    "Quiz Generator": "quiz",
+    "Progress Tracker": "evaluation",
+}
+
+# tasks.yaml entry behind each checkpoint key (its prompt template is part of the fingerprint)
+TASK_CONFIG_BY_KEY = {
+    "summary": "summarization_task",
+    "schedule": "planning_task",
+    "resources": "resource_finding_task",
+    "quiz": "quiz_generation_task",
+    "evaluation": "progress_analysis_task",
+    "report": "report_compilation_task",
+}
+
+
+def input_digest(*parts) -> str:
+    payload = json.dumps(parts, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
 class SmartStudyCrew:
-    def __init__(self, topic, notes, session_id=None):
+    def __init__(self, topic, notes, session_id=None, material_ids=None, base_session_id=None):
         self.topic = topic
         self.notes = notes
+        self.material_ids = material_ids or []
+        self.base_session_id = base_session_id
         self.tasks = SmartStudyTasks()
+        self.fingerprints = {}
         
         self.session_id = session_id or f"study_{uuid.uuid4().hex[:8]}"
-        self.memory = StudyMemory(self.session_id)
+        self.memory = session_manager.get(self.session_id)
         self.memory.set_session_context(topic, notes, {"status": "initialized"})
 
+    def on_task_started(self, task):
+        """Callback when the DAG executor launches a task"""
+        role = task.agent.role.strip()
+        emit_event("agent_start", {"agent": task.agent.role, "section": SECTION_BY_AGENT.get(role)})
+
     def on_task_completed(self, task_output):
-        """Callback to wait between tasks for quota safety"""
-        print(f"\n[QUOTA_SAFETY] Task completed. Waiting 15 seconds before next agent...")
-        time.sleep(15)
+        """Callback after each task; pacing is left to the shared quota scheduler"""
+        print(f"\n[TASK_DONE] {task_output.agent} finished.")
+        emit_event("task_done", {"agent": task_output.agent})
+
+        section = SECTION_BY_AGENT.get(task_output.agent.strip())
+        if section:
+            # Checkpoint first, so a crash after this point never re-runs the task
+            self.memory.add_agent_output(
+                task_output.agent, section, task_output.raw,
+                task_key=section, fingerprint=self.fingerprints.get(section)
+            )
+            # Deliver the specialist's section right away so the UI renders it incrementally
+            emit_event("section", {"section": section, "agent": task_output.agent, "markdown": task_output.raw})
 
     def run(self):
+        # Time breakdown (per agent, tool and phase) is stored with the session, even for failed runs
+        with track_run() as timings:
+            try:
+                return self._run()
+            finally:
+                self.memory.save_timings(timings.snapshot())
+
+    def _run(self):
         # Initialize Agents
         summarizer = create_summarizer_agent()
         scheduler = create_scheduler_agent()
@@ -40,11 +103,33 @@ class SmartStudyCrew:
         tracker = create_progress_tracker_agent()
         coordinator = create_coordinator_agent()
 
+        # Other specialists only see the top-k passages relevant to their task
+        with phase("retrieval"):
+            passages = task_passages(self.topic, self.notes, self.material_ids)
+
+        # Outputs whose inputs are unchanged: checkpoints of an interrupted run of
+        # this session, or (delta mode) of the base session being refined
+        self.fingerprints = self._fingerprint_tasks(passages)
+        reusable = self._reusable_outputs()
+
+        # Long materials are condensed on the Note Summarizer's LLM before they
+        # reach any prompt; memory keeps the full notes
+        notes = self.notes
+        if "summary" not in reusable:
+            with phase("condense_notes"), agent_scope("Note Summarizer"):
+                page_offsets = material_store.page_offsets(self.material_ids, self.notes)
+                notes = condense_notes(llm_group_a, self.topic, self.notes, page_offsets)
+        for agent in (scheduler, finder, quizzer):
+            for tool in agent.tools or []:
+                if isinstance(tool, MaterialSearchTool):
+                    tool.material_ids = self.material_ids
+                    tool.notes = self.notes
+
         # Initialize Tasks
-        summary = self.tasks.summarization_task(summarizer, self.notes, self.topic)
-        plan = self.tasks.planning_task(scheduler, self.notes, self.topic)
-        resources = self.tasks.resource_finding_task(finder, self.topic)
-        quiz = self.tasks.quiz_generation_task(quizzer, self.topic)
+        summary = self.tasks.summarization_task(summarizer, notes, self.topic)
+        plan = self.tasks.planning_task(scheduler, passages['plan_passages'], self.topic)
+        resources = self.tasks.resource_finding_task(finder, self.topic, passages['resource_passages'])
+        quiz = self.tasks.quiz_generation_task(quizzer, self.topic, passages['quiz_passages'])
         analysis = self.tasks.progress_analysis_task(tracker, self.topic)
 
         report = self.tasks.report_compilation_task(
@@ -53,10 +138,108 @@ class SmartStudyCrew:
             self.topic
         )
 
-        # Run the crew
-        result = Crew(
-            agents=[summarizer, scheduler, finder, quizzer, tracker, coordinator],
-            tasks=[summary, plan, resources, quiz, analysis, report],
+        agents = [summarizer, scheduler, finder, quizzer, tracker, coordinator]
+        tasks = [summary, plan, resources, quiz, analysis, report]
+        inputs = {'topic': self.topic, 'notes': notes, **passages}
+        completed = self._restore_outputs(reusable, {
+            "summary": summary, "schedule": plan, "resources": resources, "quiz": quiz,
+            "evaluation": analysis, "report": report
+        })
+
+        if settings.execution_mode == "parallel" or completed:
+            # Independent specialists run side by side; the coordinator starts
+            # as soon as the last of its context tasks has finished. Each group
+            # may use as many slots as there are pooled keys. A resumed run
+            # always goes through the graph executor (one task at a time in
+            # sequential mode) so checkpointed tasks are skipped.
+            parallel = settings.execution_mode == "parallel"
+            group_a = {id(summarizer), id(finder), id(tracker)}
+            result = TaskGraphExecutor(
+                tasks,
+                max_workers=settings.max_parallel_tasks if parallel else 1,
+                max_per_group=settings.max_tasks_per_llm_group * max(1, llm_pool.size),
+                group_of=lambda task: "group_a" if id(task.agent) in group_a else "group_b",
+                task_callback=self.on_task_completed,
+                task_started_callback=self.on_task_started,
+                completed=completed
+            ).run(inputs)
+        else:
+            result = self._run_sequential(agents, tasks, inputs)
+        
+        # Store final result in custom memory
+        self.memory.add_agent_output(
+            agent_name="Study Coordinator",
+            task="Final Report Compilation",
+            output=str(result),
+            task_key="report",
+            fingerprint=self.fingerprints.get("report")
+        )
+        
+        return result, self.memory
+
+    def _fingerprint_tasks(self, passages):
+        """Hash of everything each task's prompt is built from, chained through its upstream tasks"""
+        topic, _ = PlanRegistry.normalize(self.topic, "")
+        chunks = [hashlib.sha256(c.encode("utf-8")).hexdigest() for c in chunk_text(self.notes, settings.summary_chunk_tokens)]
+        own_inputs = {
+            "summary": chunks,
+            "schedule": passages["plan_passages"],
+            "resources": passages["resource_passages"],
+            "quiz": passages["quiz_passages"],
+            "evaluation": None,
+        }
+        models = settings.llm_models()
+        fingerprints = {
+            key: input_digest(key, topic, value, dict(self.tasks.tasks_config[TASK_CONFIG_BY_KEY[key]]), models)
+            for key, value in own_inputs.items()
+        }
+        fingerprints["report"] = input_digest(
+            "report", topic, [fingerprints[k] for k in own_inputs], dict(self.tasks.tasks_config["report_compilation_task"]), models
+        )
+        return fingerprints
+
+    def _reusable_outputs(self):
+        """Stored outputs whose fingerprint matches this run (own checkpoints win over the base session's)"""
+        candidates = {}
+        if self.base_session_id and session_manager.exists(self.base_session_id):
+            candidates.update(session_manager.get(self.base_session_id).get_checkpoints())
+        own = self.memory.get_checkpoints()
+        candidates.update(own)
+
+        reusable = {}
+        for key, entry in candidates.items():
+            stored = entry.get("fingerprint")
+            # Checkpoints written before fingerprinting only count for this session's own resume
+            if stored == self.fingerprints.get(key) or (stored is None and key in own and key != "report"):
+                reusable[key] = entry
+        # The report is only valid on top of exactly the same specialist outputs
+        if "report" in reusable and any(k not in reusable for k in SECTION_BY_AGENT.values()):
+            del reusable["report"]
+        return reusable
+
+    def _restore_outputs(self, reusable, tasks_by_key):
+        """Turn reused outputs into finished task outputs, checkpoint them here and re-send their sections"""
+        own = self.memory.get_checkpoints()
+        completed = {}
+        for key, task in tasks_by_key.items():
+            entry = reusable.get(key)
+            if entry is None:
+                continue
+            completed[id(task)] = TaskOutput(description=task.description, raw=entry["output"], agent=entry["agent"])
+            if key == "report":
+                continue  # stored as the final report by run()
+            if key not in own:
+                self.memory.add_agent_output(entry["agent"], key, entry["output"], task_key=key, fingerprint=self.fingerprints[key])
+            emit_event("section", {"section": key, "agent": entry["agent"], "markdown": entry["output"]})
+        if completed:
+            print(f"[DELTA] Reusing {len(completed)} stored task outputs; running {len(tasks_by_key) - len(completed)}")
+        return completed
+
+    def _run_sequential(self, agents, tasks, inputs):
+        """Original one-task-at-a-time CrewAI process"""
+        return Crew(
+            agents=agents,
+            tasks=tasks,
             process=Process.sequential,
             verbose=True,
             memory=False,
@@ -67,15 +250,6 @@ class SmartStudyCrew:
                 }
             },
             manager_llm=llm_group_b, # Use Account 2 for management
-            task_callback=self.on_task_completed # Force wait between tasks
-        ).kickoff(inputs={'topic': self.topic, 'notes': self.notes})
-        
-        # Store final result in custom memory
-        self.memory.add_agent_output(
-            agent_name="Study Coordinator",
-            task="Final Report Compilation",
-            output=str(result)
-        )
-        
-        return result, self.memory
+            task_callback=self.on_task_completed
+        ).kickoff(inputs=inputs)
 
@@ -0,0 +1,147 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Dict, List, Optional
+
+from .metrics import timed_task
+from .streaming import stream_deltas
+
+# Same divider CrewAI uses when it joins upstream outputs into a task's context
+CONTEXT_DIVIDER = "\n\n----------\n\n"
+
+
+class TaskGraphExecutor:
+    """
+    Dependency-aware runner for CrewAI tasks.
+    Builds a DAG from each task's `context` links and starts every task as soon
+    as all of its upstream tasks have finished, instead of one after another.
+    Outputs passed in `completed` (e.g. checkpoints of an interrupted run) are
+    treated as already finished, so only the missing tasks execute.
+    """
+
+    def __init__(
+        self,
+        tasks: List,
+        max_workers: int = 5,
+        max_per_group: int = 2,
+        group_of: Optional[Callable] = None,
+        task_callback: Optional[Callable] = None,
+        task_started_callback: Optional[Callable] = None,
+        completed: Optional[Dict[int, object]] = None,
+    ):
+        self.tasks = list(tasks)
+        self.max_workers = max(1, max_workers)
+        self.max_per_group = max(1, max_per_group)
+        self.group_of = group_of or (lambda task: id(task.agent))
+        self.task_callback = task_callback
+        self.task_started_callback = task_started_callback
+
+        self.dependencies = self._build_graph(self.tasks)
+        self.outputs: Dict[int, object] = dict(completed or {})
+
+    @staticmethod
+    def _context_of(task) -> List:
+        """CrewAI uses a sentinel (not a list) when no context was given"""
+        context = getattr(task, "context", None)
+        return context if isinstance(context, list) else []
+
+    def _build_graph(self, tasks: List) -> Dict[int, List[int]]:
+        """Map each task to the tasks it waits on and reject cycles"""
+        known = {id(t) for t in tasks}
+        dependencies = {}
+        for task in tasks:
+            upstream = self._context_of(task)
+            missing = [t for t in upstream if id(t) not in known]
+            if missing:
+                raise ValueError(f"Task context references a task outside the graph: {missing[0].description[:60]}")
+            dependencies[id(task)] = [id(t) for t in upstream]
+
+        # Kahn's algorithm, only to prove the graph is acyclic
+        remaining = {k: set(v) for k, v in dependencies.items()}
+        resolved = set()
+        while remaining:
+            ready = [k for k, deps in remaining.items() if deps <= resolved]
+            if not ready:
+                raise ValueError("Task context links contain a cycle")
+            for k in ready:
+                resolved.add(k)
+                del remaining[k]
+        return dependencies
+
+    def _interpolate(self, inputs: Dict):
+        """Apply kickoff inputs the way Crew.kickoff would"""
+        seen_agents = set()
+        for task in self.tasks:
+            interpolate = (
+                getattr(task, "interpolate_inputs_and_add_conversation_history", None)
+                or getattr(task, "interpolate_inputs", None)
+            )
+            if interpolate:
+                interpolate(inputs)
+            agent = task.agent
+            if agent is not None and id(agent) not in seen_agents:
+                seen_agents.add(id(agent))
+                agent.interpolate_inputs(inputs)
+
+    def _build_context(self, task) -> Optional[str]:
+        upstream = [self.outputs[id(t)] for t in self._context_of(task)]
+        if not upstream:
+            return None
+        return CONTEXT_DIVIDER.join(o.raw for o in upstream)
+
+    def _execute(self, task):
+        # Task timing; LLM and tool calls inside are attributed to this agent, whose answer streams as deltas
+        role = task.agent.role.strip()
+        with timed_task(role), stream_deltas(role):
+            return task.execute_sync(
+                agent=task.agent,
+                context=self._build_context(task),
+                tools=task.tools or task.agent.tools,
+            )
+
+    def run(self, inputs: Optional[Dict] = None):
+        """Execute the graph and return the output of the last task"""
+        if inputs:
+            self._interpolate(inputs)
+
+        by_id = {id(t): t for t in self.tasks}
+        pending = [id(t) for t in self.tasks if id(t) not in self.outputs]
+        running = {}
+        group_load: Dict[object, int] = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="smartstudy-task") as pool:
+            while pending or running:
+                for task_id in list(pending):
+                    if len(running) >= self.max_workers:
+                        break
+                    if not all(dep in self.outputs for dep in self.dependencies[task_id]):
+                        continue
+                    task = by_id[task_id]
+                    group = self.group_of(task)
+                    if group_load.get(group, 0) >= self.max_per_group:
+                        continue
+                    group_load[group] = group_load.get(group, 0) + 1
+                    pending.remove(task_id)
+                    if self.task_started_callback:
+                        self.task_started_callback(task)
+                    # Each worker gets a copy of the caller's context so per-session log routing follows it
+                    ctx = contextvars.copy_context()
+                    running[pool.submit(ctx.run, self._execute, task)] = (task_id, group)
+
+                if not running:
+                    raise RuntimeError("Task graph stalled: no runnable tasks left")
+
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    task_id, group = running.pop(future)
+                    group_load[group] -= 1
+                    try:
+                        output = future.result()
+                    except Exception:
+                        for other in running:
+                            other.cancel()
+                        raise
+                    self.outputs[task_id] = output
+                    if self.task_callback:
+                        self.task_callback(output)
+
+        return self.outputs[id(self.tasks[-1])]
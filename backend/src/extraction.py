@@ -0,0 +1,160 @@
+import asyncio
+import hashlib
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from .config.settings import settings
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class ExtractionError(Exception):
+    """Upload rejected (size/page limits) before or during extraction"""
+
+    def __init__(self, message: str, status_code: int = 413):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+# --- Worker-side parsers (run in the process pool; imports stay local to the worker) ---
+
+def _pdf_page_count(path: str) -> int:
+    import pypdf
+    return len(pypdf.PdfReader(path).pages)
+
+
+def _extract_pdf_range(path: str, start: int, end: int) -> List[str]:
+    import pypdf
+    reader = pypdf.PdfReader(path)
+    return [(reader.pages[i].extract_text() or "") for i in range(start, end)]
+
+
+def _extract_docx(path: str) -> List[str]:
+    from docx import Document
+    doc = Document(path)
+    return ["\n".join(para.text for para in doc.paragraphs)]
+
+
+def _extract_pptx(path: str) -> List[str]:
+    from pptx import Presentation
+    prs = Presentation(path)
+    slides = []
+    for slide in prs.slides:
+        slides.append("\n".join(shape.text for shape in slide.shapes if hasattr(shape, "text")))
+    return slides
+
+
+def _warm_parsers() -> int:
+    """Import every parser in this worker so its first real job does not pay for it"""
+    import docx  # noqa: F401
+    import pptx  # noqa: F401
+    import pypdf  # noqa: F401
+    return os.getpid()
+
+
+def _read_text(path: str) -> List[str]:
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        return [f.read()]
+
+
+# --- Event-loop side ---
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def process_pool() -> ProcessPoolExecutor:
+    """Shared parser pool, created on first upload ('spawn' keeps workers clear of server threads)"""
+    global _pool
+    if _pool is None:
+        workers = settings.extraction_workers or min(4, os.cpu_count() or 1)
+        _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def _replace_broken_pool(broken: ProcessPoolExecutor):
+    """Drop a pool whose worker died (segfault/OOM); the next process_pool() call starts a fresh one"""
+    global _pool
+    if _pool is broken:  # a concurrent upload may already have replaced it
+        _pool = None
+        broken.shutdown(wait=False, cancel_futures=True)
+        print("[EXTRACT] A parser worker died; restarting the worker pool")
+
+
+def warm_workers():
+    """Start the parser pool's workers and have each import the parsers (blocking)"""
+    pool = process_pool()
+    # Workers are spawned on demand, one per pending job
+    futures = [pool.submit(_warm_parsers) for _ in range(pool._max_workers)]
+    for future in futures:
+        future.result()
+
+
+async def save_upload(upload, dest: Path, max_bytes: int) -> Tuple[int, str]:
+    """Stream an UploadFile to disk in chunks, enforcing the size limit. Returns (bytes written, SHA-256)."""
+    written = 0
+    digest = hashlib.sha256()
+    tmp_path = dest.with_name(dest.name + ".part")
+    try:
+        with open(tmp_path, "wb") as f:
+            while True:
+                chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > max_bytes:
+                    raise ExtractionError(f"File exceeds the {max_bytes // (1024 * 1024)} MB upload limit")
+                digest.update(chunk)
+                await asyncio.to_thread(f.write, chunk)
+        os.replace(tmp_path, dest)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+    return written, digest.hexdigest()
+
+
+async def _extract_pdf(path: str) -> List[str]:
+    loop = asyncio.get_running_loop()
+    pool = process_pool()
+    page_count = await loop.run_in_executor(pool, _pdf_page_count, path)
+    if page_count > settings.max_pdf_pages:
+        raise ExtractionError(f"PDF has {page_count} pages; the limit is {settings.max_pdf_pages}")
+
+    # Large PDFs are split into page ranges parsed side by side
+    step = max(1, settings.pdf_pages_per_job)
+    jobs = [
+        loop.run_in_executor(pool, _extract_pdf_range, path, start, min(start + step, page_count))
+        for start in range(0, page_count, step)
+    ]
+    pages: List[str] = []
+    for batch in await asyncio.gather(*jobs):
+        pages.extend(batch)
+    return pages
+
+
+async def extract_pages(path: Path) -> List[str]:
+    """Extract text per page (PDF), per slide (PPTX) or as one block, off the event loop"""
+    pool = process_pool()
+    try:
+        return await _extract(path)
+    except BrokenProcessPool:
+        # Retried once on a fresh pool; a file that kills its worker again fails the upload
+        _replace_broken_pool(pool)
+        return await _extract(path)
+
+
+async def _extract(path: Path) -> List[str]:
+    name = path.name.lower()
+    loop = asyncio.get_running_loop()
+
+    if name.endswith('.pdf'):
+        return await _extract_pdf(str(path))
+    if name.endswith('.docx') or name.endswith('.doc'):
+        return await loop.run_in_executor(process_pool(), _extract_docx, str(path))
+    if name.endswith('.pptx'):
+        return await loop.run_in_executor(process_pool(), _extract_pptx, str(path))
+    # .txt, .md and fallback: plain text decode
+    return await asyncio.to_thread(_read_text, str(path))
@@ -0,0 +1,129 @@
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Dict
+
+from .config.settings import settings
+
+
+class QueueFullError(Exception):
+    """Raised when a crew run cannot be admitted"""
+
+    def __init__(self, message: str, status_code: int, position: int, eta_seconds: float):
+        super().__init__(message)
+        self.status_code = status_code
+        self.position = position
+        self.eta_seconds = eta_seconds
+
+
+class CrewJobQueue:
+    """
+    Fixed pool of crew workers fed by a fair FIFO queue.
+    Jobs are queued per client and dispatched round-robin across clients, so
+    one client submitting a burst cannot starve everyone else.
+    """
+
+    def __init__(self, max_workers: int, max_queued: int, per_client_limit: int, expected_seconds: float):
+        self.max_workers = max(1, max_workers)
+        self.max_queued = max_queued
+        self.per_client_limit = per_client_limit
+        self.avg_runtime = expected_seconds
+        self.running = 0
+        self._queues: "OrderedDict[str, deque]" = OrderedDict()
+        self._cond = threading.Condition()
+        self._workers = []
+
+    @classmethod
+    def from_settings(cls, config) -> "CrewJobQueue":
+        return cls(
+            max_workers=config.crew_workers,
+            max_queued=config.crew_queue_max,
+            per_client_limit=config.crew_queue_per_client,
+            expected_seconds=config.crew_expected_seconds,
+        )
+
+    def _start_workers(self):
+        # Threads are started lazily so importing this module stays cheap
+        while len(self._workers) < self.max_workers:
+            worker = threading.Thread(target=self._work, name=f"crew-worker-{len(self._workers)}", daemon=True)
+            self._workers.append(worker)
+            worker.start()
+
+    @property
+    def queued(self) -> int:
+        return sum(len(q) for q in self._queues.values())
+
+    def _fair_position(self, client_id: str) -> int:
+        """Position a new job from this client would get under round-robin dispatch"""
+        ahead_own = len(self._queues.get(client_id, ()))
+        ahead_others = sum(
+            min(len(q), ahead_own + 1) for c, q in self._queues.items() if c != client_id
+        )
+        return ahead_own + ahead_others + 1
+
+    def eta_for(self, position: int) -> float:
+        """Seconds until a job at `position` starts, from the average run time"""
+        free_now = max(0, self.max_workers - self.running)
+        if position <= free_now:
+            return 0.0
+        return math.ceil((position - free_now) / self.max_workers) * self.avg_runtime
+
+    def submit(self, client_id: str, fn: Callable, *args) -> int:
+        """Queue a job and return its position (0 = starts immediately)"""
+        with self._cond:
+            self._start_workers()
+            position = self._fair_position(client_id)
+            if len(self._queues.get(client_id, ())) >= self.per_client_limit:
+                raise QueueFullError(
+                    "Too many queued study plans for this client", 429, position, self.eta_for(position)
+                )
+            if self.queued >= self.max_queued:
+                raise QueueFullError("Study plan queue is full", 503, position, self.eta_for(position))
+
+            self._queues.setdefault(client_id, deque()).append((fn, args))
+            self._cond.notify()
+            return 0 if position <= self.max_workers - self.running else position
+
+    def _next_job(self):
+        client_id, jobs = next(iter(self._queues.items()))
+        job = jobs.popleft()
+        del self._queues[client_id]
+        if jobs:
+            self._queues[client_id] = jobs  # back of the round-robin line
+        return job
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._queues:
+                    self._cond.wait()
+                fn, args = self._next_job()
+                self.running += 1
+
+            started = time.monotonic()
+            try:
+                fn(*args)
+            except Exception as e:
+                print(f"[CREW_QUEUE] Job failed: {e}")
+            finally:
+                elapsed = time.monotonic() - started
+                with self._cond:
+                    self.running -= 1
+                    # Exponential moving average keeps the ETA current
+                    self.avg_runtime = 0.8 * self.avg_runtime + 0.2 * elapsed
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return {
+                "workers": self.max_workers,
+                "running": self.running,
+                "queued": self.queued,
+                "max_queued": self.max_queued,
+                "clients_waiting": len(self._queues),
+                "avg_runtime_seconds": round(self.avg_runtime, 1),
+            }
+
+
+# Singleton instance
+crew_queue = CrewJobQueue.from_settings(settings)
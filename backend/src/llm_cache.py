@@ -0,0 +1,189 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from .config.settings import settings
+
+if TYPE_CHECKING:  # langchain_core is only imported once the LLM stack is (see src/warmup.py)
+    from langchain_core.outputs import ChatResult
+
+
+class ResponseCache:
+    """
+    Content-addressed cache for chat completions.
+    Hot entries live in an in-memory LRU; everything is also written to disk
+    (one JSON file per key) so repeated submissions survive restarts. Entries
+    older than `ttl_seconds` are treated as misses and removed; every 50
+    writes the disk store is pruned of expired files and of the least
+    recently used beyond `max_disk_entries` (disk hits touch the file).
+    """
+
+    def __init__(self, cache_dir: Path, max_entries: int = 256, ttl_seconds: float = 7 * 86400,
+                 max_disk_entries: int = 5000):
+        self.cache_dir = Path(cache_dir)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_entries = max_disk_entries
+        self._memory: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_settings(cls, config) -> "ResponseCache":
+        return cls(
+            config.output_dir / "cache" / "llm",
+            max_entries=config.llm_cache_max_entries,
+            ttl_seconds=config.llm_cache_ttl_seconds,
+            max_disk_entries=config.llm_cache_max_disk_entries,
+        )
+
+    @staticmethod
+    def make_key(messages: List, model: str, temperature: float, stop: Optional[List[str]] = None) -> str:
+        """SHA-256 over the rendered conversation plus everything that changes the answer"""
+        rendered = json.dumps(
+            {
+                "messages": [[m.type, m.content] for m in messages],
+                "model": model,
+                "temperature": temperature,
+                "stop": stop or [],
+            },
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str,
+        )
+        return hashlib.sha256(rendered.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def _expired(self, entry: Dict) -> bool:
+        return time.time() - entry["created_at"] > self.ttl_seconds
+
+    def _remember(self, key: str, entry: Dict):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def _read_disk(self, key: str) -> Optional[Dict]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if self._expired(entry):
+            path.unlink(missing_ok=True)
+            return None
+        try:
+            os.utime(path)  # LRU order on disk
+        except OSError:
+            pass
+        return entry
+
+    def get(self, key: str) -> Optional["ChatResult"]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and self._expired(entry):
+                del self._memory[key]
+                entry = None
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return self._to_result(entry)
+
+        entry = self._read_disk(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self._remember(key, entry)
+            self.hits += 1
+            self.disk_hits += 1
+        return self._to_result(entry)
+
+    def put(self, key: str, result: "ChatResult"):
+        from langchain_core.messages import messages_to_dict
+
+        entry = {
+            "created_at": time.time(),
+            "generations": [
+                {"message": messages_to_dict([g.message])[0], "generation_info": g.generation_info}
+                for g in result.generations
+            ],
+            "llm_output": result.llm_output,
+        }
+        with self._lock:
+            self._remember(key, entry)
+            self._writes += 1
+            prune = self._writes % 50 == 0
+
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False, default=str)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            tmp_path.unlink(missing_ok=True)
+            print(f"[LLM_CACHE] Could not persist entry {key[:12]}: {e}")
+        if prune:
+            self.prune()
+
+    @staticmethod
+    def _to_result(entry: Dict) -> "ChatResult":
+        from langchain_core.messages import messages_from_dict
+        from langchain_core.outputs import ChatGeneration, ChatResult
+
+        generations = [
+            ChatGeneration(
+                message=messages_from_dict([g["message"]])[0],
+                generation_info=g.get("generation_info"),
+            )
+            for g in entry["generations"]
+        ]
+        return ChatResult(generations=generations, llm_output=entry.get("llm_output"))
+
+    def prune(self) -> int:
+        """Drop expired on-disk entries, then the least recently used beyond max_disk_entries"""
+        now = time.time()
+        files = []
+        for path in self.cache_dir.glob("*/*.json"):
+            try:
+                files.append((path.stat().st_mtime, path))
+            except OSError:
+                continue
+        files.sort()
+        removed = 0
+        for i, (mtime, path) in enumerate(files):
+            if now - mtime > self.ttl_seconds or len(files) - i > self.max_disk_entries:
+                path.unlink(missing_ok=True)
+                removed += 1
+        return removed
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "evictions": self.evictions,
+            }
+
+
+# Singleton instance
+response_cache = ResponseCache.from_settings(settings)
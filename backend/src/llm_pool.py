@@ -0,0 +1,288 @@
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel, generate_from_stream
+from langchain_core.outputs import ChatGenerationChunk
+from langchain_google_genai import ChatGoogleGenerativeAI
+
+from .config.settings import settings
+from .rate_limiter import quota_scheduler, estimate_tokens, is_quota_error, parse_retry_after, key_fingerprint
+from .llm_cache import response_cache
+from .metrics import record_cache, record_llm_call, record_llm_request, record_llm_retry, record_llm_wait
+from .streaming import delta_publisher
+
+
+class QuotaSafeLLM(ChatGoogleGenerativeAI):
+    """Admits every call through the shared quota scheduler; backs off with jitter on 429s"""
+    # None -> settings.llm_max_retries; pool members use 0 and fail over instead
+    max_quota_retries: Optional[int] = None
+
+    @property
+    def quota_key(self) -> str:
+        api_key = self.google_api_key.get_secret_value() if self.google_api_key else None
+        return key_fingerprint(api_key)
+
+    @property
+    def quota_retry_limit(self) -> int:
+        return settings.llm_max_retries if self.max_quota_retries is None else self.max_quota_retries
+
+    def _admit(self, estimated: int):
+        # Admission wait includes holding out a backoff after a 429
+        record_llm_wait(self.model, quota_scheduler.acquire(self.quota_key, self.model, estimated), "quota")
+
+    def _back_off(self, error: Exception, attempt: int):
+        """Penalize the key after a 429; re-raises anything else, or once retries are used up"""
+        if not is_quota_error(error):
+            raise error
+        delay = quota_scheduler.backoff_delay(attempt, parse_retry_after(error))
+        quota_scheduler.penalize(self.quota_key, self.model, delay)
+        if attempt >= self.quota_retry_limit:
+            raise error
+        record_llm_retry(self.model, "backoff")
+        print(f"\n[QUOTA_ALERT] Rate limit reached on key {self.quota_key}. Backing off {delay:.1f}s (attempt {attempt + 1}/{self.quota_retry_limit})...")
+
+    def _record_success(self, started: float, estimated: int, usage: Optional[Dict]):
+        record_llm_request(self.model, time.monotonic() - started, ok=True, usage=usage)
+        quota_scheduler.record_usage(self.quota_key, self.model, estimated, (usage or {}).get("total_tokens"))
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        estimated = estimate_tokens("".join(str(m.content) for m in messages))
+        attempt = 0
+        while True:
+            self._admit(estimated)
+            started = time.monotonic()
+            try:
+                result = super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            except Exception as e:
+                record_llm_request(self.model, time.monotonic() - started, ok=False)
+                self._back_off(e, attempt)
+                attempt += 1
+                continue
+
+            usage = getattr(result.generations[0].message, "usage_metadata", None) if result.generations else None
+            self._record_success(started, estimated, usage)
+            return result
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        """Gemini streaming generation behind the same admission and backoff as _generate"""
+        estimated = estimate_tokens("".join(str(m.content) for m in messages))
+        attempt = 0
+        while True:
+            self._admit(estimated)
+            started = time.monotonic()
+            message = None
+            try:
+                for chunk in super()._stream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                    message = chunk.message if message is None else message + chunk.message
+                    yield chunk
+            except Exception as e:
+                record_llm_request(self.model, time.monotonic() - started, ok=False)
+                if message is not None:
+                    raise e  # part of the answer is already out; a retry would repeat it
+                self._back_off(e, attempt)
+                attempt += 1
+                continue
+
+            # Chunks carry incremental usage, so the merged message holds the call's total
+            self._record_success(started, estimated, getattr(message, "usage_metadata", None))
+            return
+
+
+class PoolMember:
+    """One (API key, model) slot in the pool with its live load and health"""
+
+    def __init__(self, api_key: str, model: str):
+        self.api_key = api_key
+        self.model = model
+        self.key_id = key_fingerprint(api_key)
+        self.in_flight = 0
+        self.failures = 0
+        self.cooldown_until = 0.0
+        self.clients: Dict[float, QuotaSafeLLM] = {}
+
+    def client(self, temperature: float) -> QuotaSafeLLM:
+        """Gemini clients are built lazily, one per temperature"""
+        if temperature not in self.clients:
+            self.clients[temperature] = QuotaSafeLLM(
+                model=self.model,
+                google_api_key=self.api_key,
+                temperature=temperature,
+                max_quota_retries=0
+            )
+        return self.clients[temperature]
+
+    def healthy(self, now: float) -> bool:
+        return self.cooldown_until <= now
+
+
+class LLMPool:
+    """
+    N API keys x M models behind one router.
+    Each call goes to the least-loaded healthy key for the requested model;
+    a key returning RESOURCE_EXHAUSTED is cooled down and the call fails over.
+    """
+
+    def __init__(self, api_keys: List[str], models: List[str]):
+        if not models:
+            raise ValueError("LLM pool needs at least one model")
+        self.models = models
+        self.members = [PoolMember(key, model) for key in api_keys for model in models]
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, config) -> "LLMPool":
+        return cls(config.api_keys(), config.llm_models())
+
+    @property
+    def size(self) -> int:
+        """Number of distinct API keys"""
+        return len({m.key_id for m in self.members})
+
+    def llm(self, model: Optional[str] = None, temperature: float = 0.1) -> "PooledLLM":
+        """Chat model handle for an Agent; every call is routed through the pool"""
+        return PooledLLM(pool=self, model=model or self.models[0], temperature=temperature)
+
+    def _candidates(self, model: str) -> List[PoolMember]:
+        matching = [m for m in self.members if m.model == model]
+        return matching or self.members
+
+    def _load(self, member: PoolMember) -> tuple:
+        remaining = quota_scheduler.remaining(member.key_id, member.model)
+        return (
+            member.in_flight + quota_scheduler.queue_depth(member.key_id),
+            -remaining["rpm"],
+            -remaining["rpd"],
+        )
+
+    def _acquire(self, model: str) -> PoolMember:
+        """Reserve the least-loaded healthy member, waiting out cooldowns if all are cooling"""
+        if not self.members:
+            raise ValueError("No Gemini API keys configured (set GOOGLE_API_KEYS or GOOGLE_API_KEY)")
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                candidates = self._candidates(model)
+                healthy = [m for m in candidates if m.healthy(now)]
+                if healthy:
+                    member = min(healthy, key=self._load)
+                    member.in_flight += 1
+                    return member
+                wait = min(m.cooldown_until for m in candidates) - now
+            print(f"\n[POOL] All keys for {model} are cooling down. Waiting {wait:.1f}s...")
+            time.sleep(max(wait, 0.05))
+            record_llm_wait(model, max(wait, 0.05), "cooldown")
+
+    def _release(self, member: PoolMember, error: Optional[Exception] = None):
+        with self._lock:
+            member.in_flight -= 1
+            if error is None:
+                member.failures = 0
+                return
+            if is_quota_error(error):
+                blocked = quota_scheduler.remaining(member.key_id, member.model)["blocked_for"]
+                cooldown = max(blocked, quota_scheduler.backoff_delay(member.failures))
+                member.failures += 1
+                member.cooldown_until = time.monotonic() + cooldown
+                print(f"\n[POOL_FAILOVER] Key {member.key_id} ({member.model}) exhausted. Cooling down {cooldown:.1f}s and rerouting...")
+
+    def generate(self, model: str, temperature: float, messages, **kwargs):
+        """Run one chat completion on the best available key, failing over on quota errors"""
+        attempt = 0
+        while True:
+            member = self._acquire(model)
+            try:
+                result = member.client(temperature)._generate(messages, **kwargs)
+            except Exception as e:
+                self._release(member, e)
+                if not is_quota_error(e) or attempt >= settings.llm_max_retries:
+                    raise e
+                attempt += 1
+                record_llm_retry(model, "failover")
+                continue
+            self._release(member)
+            return result
+
+    def stream(self, model: str, temperature: float, messages, **kwargs) -> Iterator[ChatGenerationChunk]:
+        """Streaming variant of generate(); fails over only until the first chunk is out"""
+        attempt = 0
+        while True:
+            member = self._acquire(model)
+            started = False
+            error = None
+            try:
+                for chunk in member.client(temperature)._stream(messages, **kwargs):
+                    started = True
+                    yield chunk
+            except Exception as e:
+                error = e
+            finally:
+                # Also runs when the consumer abandons the stream
+                self._release(member, error)
+            if error is None:
+                return
+            if started or not is_quota_error(error) or attempt >= settings.llm_max_retries:
+                raise error
+            attempt += 1
+            record_llm_retry(model, "failover")
+
+    def stats(self) -> List[Dict]:
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "key": m.key_id,
+                    "model": m.model,
+                    "in_flight": m.in_flight,
+                    "healthy": m.healthy(now),
+                    "cooldown_for": max(0.0, m.cooldown_until - now),
+                    "consecutive_failures": m.failures,
+                }
+                for m in self.members
+            ]
+
+
+class PooledLLM(BaseChatModel):
+    """LangChain chat model that answers from the response cache or delegates to an LLMPool"""
+    pool: Any
+    model: str
+    temperature: float = 0.1
+
+    @property
+    def _llm_type(self) -> str:
+        return "smartstudy-pool"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        started = time.monotonic()
+        publish = delta_publisher()
+        if not settings.llm_cache_enabled:
+            result = self._complete(messages, publish, stop=stop, run_manager=run_manager, **kwargs)
+            record_llm_call(self.model, time.monotonic() - started, cached=False)
+            return result
+
+        key = response_cache.make_key(messages, self.model, self.temperature, stop)
+        cached = response_cache.get(key)
+        record_cache("llm", cached is not None)
+        if cached is not None:
+            print(f"\n[LLM_CACHE] Hit {key[:12]} ({self.model}). Skipping Gemini call.")
+            record_llm_call(self.model, time.monotonic() - started, cached=True)
+            if publish is not None and cached.generations:
+                publish(cached.generations[0].text)
+            return cached
+
+        result = self._complete(messages, publish, stop=stop, run_manager=run_manager, **kwargs)
+        response_cache.put(key, result)
+        record_llm_call(self.model, time.monotonic() - started, cached=False)
+        return result
+
+    def _complete(self, messages, publish, **kwargs):
+        """Whole completion from the pool, streamed (and forwarded to `publish`) when a session is watching"""
+        if publish is None:
+            return self.pool.generate(self.model, self.temperature, messages, **kwargs)
+
+        def forwarded(chunks):
+            for chunk in chunks:
+                publish(chunk.text)
+                yield chunk
+
+        return generate_from_stream(forwarded(self.pool.stream(self.model, self.temperature, messages, **kwargs)))
@@ -0,0 +1,129 @@
+import io
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional
+
+from .config.settings import settings
+
+# Regex to strip ANSI color codes for clean frontend logs
+ANSI_ESCAPE = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
+
+# Sink of the session whose code is running in this thread / task
+current_sink: ContextVar[Optional["SessionLogSink"]] = ContextVar("smartstudy_log_sink", default=None)
+
+
+class SessionLogSink:
+    """
+    Collects one session's stdout fragments and forwards them in batches.
+    Fragments are only joined and ANSI-stripped at flush time, which happens
+    on newline once the time window has elapsed, when the buffer is large, or
+    from the background flusher — not on every tiny write.
+    """
+
+    def __init__(self, target, flush_interval: float = 0.25, max_buffer: int = 4096):
+        self.target = target
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self._parts: List[str] = []
+        self._size = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    def write(self, data: str):
+        with self._lock:
+            self._parts.append(data)
+            self._size += len(data)
+            due = time.monotonic() - self._last_flush >= self.flush_interval
+            if self._size >= self.max_buffer or (due and "\n" in data):
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        self._last_flush = time.monotonic()
+        if not self._parts:
+            return
+        chunk = ANSI_ESCAPE.sub('', "".join(self._parts))
+        self._parts = []
+        self._size = 0
+        if chunk.strip():
+            self.target.put(chunk)
+
+
+class SessionStdoutRouter(io.TextIOBase):
+    """Installed once as sys.stdout; routes each write to the current session's sink"""
+
+    def __init__(self, fallback):
+        self.fallback = fallback
+
+    def write(self, data):
+        if not data:
+            return 0
+        sink = current_sink.get()
+        if sink is None:
+            return self.fallback.write(data)
+        sink.write(data)
+        return len(data)
+
+    def flush(self):
+        sink = current_sink.get()
+        if sink is None:
+            self.fallback.flush()
+
+    def isatty(self):
+        return False
+
+
+def flush_current():
+    """Push out anything the current session has buffered (keeps logs ordered before typed events)"""
+    sink = current_sink.get()
+    if sink is not None:
+        sink.flush()
+
+
+_install_lock = threading.Lock()
+_active_sinks: List[SessionLogSink] = []
+_flusher: Optional[threading.Thread] = None
+
+
+def _flush_loop():
+    while True:
+        time.sleep(settings.log_flush_interval)
+        with _install_lock:
+            sinks = list(_active_sinks)
+        for sink in sinks:
+            sink.flush()
+
+
+def install_router():
+    """Replace sys.stdout with the session router (idempotent)"""
+    global _flusher
+    with _install_lock:
+        if not isinstance(sys.stdout, SessionStdoutRouter):
+            sys.stdout = SessionStdoutRouter(sys.stdout)
+        if _flusher is None:
+            _flusher = threading.Thread(target=_flush_loop, name="log-flusher", daemon=True)
+            _flusher.start()
+
+
+@contextmanager
+def capture_session(target):
+    """Route everything printed in this context (and tasks spawned with a copy of it) to `target.put`"""
+    install_router()
+    sink = SessionLogSink(target, settings.log_flush_interval, settings.log_max_buffer)
+    token = current_sink.set(sink)
+    with _install_lock:
+        _active_sinks.append(sink)
+    try:
+        yield sink
+    finally:
+        current_sink.reset(token)
+        with _install_lock:
+            _active_sinks.remove(sink)
+        sink.flush()
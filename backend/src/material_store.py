@@ -0,0 +1,144 @@
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from .config.settings import settings
+
+
+class MaterialStore:
+    """
+    Content-addressed store for uploaded materials.
+    Each upload lives in materials/<sha256>/ as `source<ext>` plus
+    `extraction.json` (text, page count, per-page offsets), so re-uploading the
+    same bytes returns the cached extraction and identical names never collide.
+    The extraction file's mtime doubles as the last-access time for LRU eviction.
+    """
+
+    RECORD_NAME = "extraction.json"
+
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.evict_listeners: List[Callable[[str], None]] = []  # called with each evicted digest
+
+    @classmethod
+    def from_settings(cls, config) -> "MaterialStore":
+        return cls(config.output_dir / "materials", config.materials_max_mb * 1024 * 1024)
+
+    @property
+    def incoming_dir(self) -> Path:
+        """Scratch area for uploads whose hash is not known yet"""
+        path = self.root / ".incoming"
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def _entry_dir(self, digest: str) -> Path:
+        return self.root / digest
+
+    def lookup(self, digest: str) -> Optional[Dict]:
+        """Cached extraction for these bytes, if present (marks it as recently used)"""
+        record_path = self._entry_dir(digest) / self.RECORD_NAME
+        try:
+            with open(record_path, "r", encoding="utf-8") as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+        os.utime(record_path)
+        return record
+
+    def find(self, name: str) -> Optional[Dict]:
+        """Record for a SHA-256 digest or an uploaded filename (latest upload of that name)"""
+        name = name.strip()
+        if len(name) == 64 and all(c in "0123456789abcdef" for c in name.lower()):
+            return self.lookup(name.lower())
+        latest = None
+        for entry_dir in self.root.iterdir() if self.root.exists() else []:
+            try:
+                with open(entry_dir / self.RECORD_NAME, "r", encoding="utf-8") as f:
+                    record = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if record["filename"].casefold() == name.casefold() and (latest is None or record["created_at"] > latest["created_at"]):
+                latest = record
+        return self.lookup(latest["sha256"]) if latest else None
+
+    def page_offsets(self, digests: List[str], text: str) -> Optional[List[int]]:
+        """Page start offsets within `text`, when it is the extracted text of one of these uploads"""
+        for digest in digests:
+            record = self.lookup(digest)
+            if record is None or record["text"].strip() != text.strip():
+                continue
+            # The client may have trimmed leading whitespace off the extraction
+            shift = (len(record["text"]) - len(record["text"].lstrip())) - (len(text) - len(text.lstrip()))
+            return [max(0, offset - shift) for offset in record["page_offsets"]]
+        return None
+
+    def store(self, digest: str, upload_path: Path, filename: str, pages: List[str]) -> Dict:
+        """Move a freshly extracted upload into the store and record its extraction"""
+        offsets = []
+        position = 0
+        for page in pages:
+            offsets.append(position)
+            position += len(page) + 1  # pages are joined with "\n"
+
+        entry_dir = self._entry_dir(digest)
+        entry_dir.mkdir(parents=True, exist_ok=True)
+        source_path = entry_dir / f"source{Path(filename).suffix.lower()}"
+        os.replace(upload_path, source_path)
+
+        record = {
+            "sha256": digest,
+            "filename": filename,
+            "source_path": str(source_path),
+            "size_bytes": source_path.stat().st_size,
+            "page_count": len(pages),
+            "page_offsets": offsets,
+            "text": "\n".join(pages),
+            "created_at": time.time(),
+        }
+        tmp_path = entry_dir / (self.RECORD_NAME + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(record, f, ensure_ascii=False)
+        os.replace(tmp_path, entry_dir / self.RECORD_NAME)
+
+        self.evict(keep=digest)
+        return record
+
+    def _entries(self) -> List[Dict]:
+        entries = []
+        for entry_dir in self.root.iterdir():
+            record_path = entry_dir / self.RECORD_NAME
+            if not entry_dir.is_dir() or not record_path.exists():
+                continue
+            size = sum(p.stat().st_size for p in entry_dir.iterdir() if p.is_file())
+            entries.append({"digest": entry_dir.name, "size": size, "last_access": record_path.stat().st_mtime})
+        return entries
+
+    def evict(self, keep: Optional[str] = None) -> int:
+        """Drop least-recently-used entries until the store fits in max_bytes"""
+        removed = 0
+        with self._lock:
+            entries = sorted(self._entries(), key=lambda e: e["last_access"])
+            total = sum(e["size"] for e in entries)
+            for entry in entries:
+                if total <= self.max_bytes:
+                    break
+                if entry["digest"] == keep:
+                    continue
+                shutil.rmtree(self._entry_dir(entry["digest"]), ignore_errors=True)
+                total -= entry["size"]
+                removed += 1
+                for listener in self.evict_listeners:
+                    listener(entry["digest"])
+        if removed:
+            print(f"[MATERIALS] Evicted {removed} least-recently-used uploads")
+        return removed
+
+
+# Singleton instance
+material_store = MaterialStore.from_settings(settings)
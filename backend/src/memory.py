@@ -3,11 +3,16 @@ from pathlib import Path
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 from .config.settings import settings
+from .memory_store import SegmentedLog, atomic_write_json, memory_writer
+from .memory_index import memory_index
 
 class StudyMemory:
     """
     Custom file-based memory system for multi-agent study sessions.
     Stores session context, agent outputs, and conversation history.
+    Outputs and turns are append-only JSONL segments written by the shared
+    group-commit writer; context.json is replaced atomically. History is
+    only read from disk the first time it is asked for.
     """
     
     def __init__(self, session_id: str):
@@ -16,13 +21,35 @@ class StudyMemory:
         self.memory_dir.mkdir(parents=True, exist_ok=True)
         
         self.context_file = self.memory_dir / "context.json"
-        self.agent_outputs_file = self.memory_dir / "agent_outputs.json"
-        self.conversation_file = self.memory_dir / "conversation.json"
+        self.agent_outputs_log = self._open_log("agent_outputs")
+        self.conversation_log = self._open_log("conversation")
+        self._agent_outputs: Optional[List[Dict]] = None
+        self._conversation: Optional[List[Dict]] = None
         
         self._load_or_initialize()
     
+    @staticmethod
+    def session_exists(session_id: str) -> bool:
+        """Check for a stored session without creating its directory"""
+        return (settings.output_dir / "memory" / session_id / "context.json").exists()
+    
+    def _open_log(self, name: str) -> SegmentedLog:
+        log = SegmentedLog(
+            self.memory_dir, name, memory_writer,
+            segment_max_bytes=settings.memory_segment_max_kb * 1024,
+            max_segments=settings.memory_max_segments
+        )
+        # Sessions written before segments existed: migrate <name>.json once
+        legacy_file = self.memory_dir / f"{name}.json"
+        if legacy_file.exists():
+            if not log.exists():
+                with open(legacy_file, 'r', encoding='utf-8') as f:
+                    log.rewrite(json.load(f))
+            legacy_file.unlink()
+        return log
+    
     def _load_or_initialize(self):
-        """Load existing memory or initialize new session"""
+        """Load existing context or initialize new session (history loads lazily)"""
         if self.context_file.exists():
             with open(self.context_file, 'r', encoding='utf-8') as f:
                 self.context = json.load(f)
@@ -35,35 +62,32 @@ class StudyMemory:
                 "metadata": {}
             }
             self._save_context()
-        
-        if self.agent_outputs_file.exists():
-            with open(self.agent_outputs_file, 'r', encoding='utf-8') as f:
-                self.agent_outputs = json.load(f)
-        else:
-            self.agent_outputs = []
-            self._save_agent_outputs()
-        
-        if self.conversation_file.exists():
-            with open(self.conversation_file, 'r', encoding='utf-8') as f:
-                self.conversation = json.load(f)
-        else:
-            self.conversation = []
-            self._save_conversation()
+            memory_index.register_session(self.session_id)
+    
+    @property
+    def agent_outputs(self) -> List[Dict]:
+        if self._agent_outputs is None:
+            self._agent_outputs = self.agent_outputs_log.read_all()
+        return self._agent_outputs
+    
+    @property
+    def conversation(self) -> List[Dict]:
+        if self._conversation is None:
+            self._conversation = self.conversation_log.read_all()
+        return self._conversation
     
     def _save_context(self):
         """Persist context to disk"""
-        with open(self.context_file, 'w', encoding='utf-8') as f:
-            json.dump(self.context, f, indent=2, ensure_ascii=False)
+        atomic_write_json(self.context_file, self.context)
     
-    def _save_agent_outputs(self):
-        """Persist agent outputs to disk"""
-        with open(self.agent_outputs_file, 'w', encoding='utf-8') as f:
-            json.dump(self.agent_outputs, f, indent=2, ensure_ascii=False)
+    def flush(self):
+        """Block until queued appends are on disk"""
+        memory_writer.flush()
     
-    def _save_conversation(self):
-        """Persist conversation history to disk"""
-        with open(self.conversation_file, 'w', encoding='utf-8') as f:
-            json.dump(self.conversation, f, indent=2, ensure_ascii=False)
+    def compact(self):
+        """Merge this session's sealed log segments"""
+        self.agent_outputs_log.compact()
+        self.conversation_log.compact()
     
     def set_session_context(self, topic: str, notes: str, metadata: Optional[Dict] = None):
         """Set the session context (topic, notes, metadata)"""
@@ -73,16 +97,32 @@ class StudyMemory:
             self.context["metadata"].update(metadata)
         self._save_context()
     
-    def add_agent_output(self, agent_name: str, task: str, output: str):
-        """Store output from a specific agent"""
+    def save_timings(self, timings: Dict):
+        """Store the latest run's time breakdown (per agent, tool and phase)"""
+        self.context["timings"] = timings
+        self._save_context()
+    
+    def get_timings(self) -> Optional[Dict]:
+        """Time breakdown of the latest run, if one finished or failed"""
+        return self.context.get("timings")
+    
+    def add_agent_output(self, agent_name: str, task: str, output: str,
+                         task_key: Optional[str] = None, fingerprint: Optional[str] = None):
+        """Store output from a specific agent (task_key marks it as a reusable checkpoint)"""
         entry = {
             "agent": agent_name,
             "task": task,
             "output": output,
             "timestamp": datetime.now().isoformat()
         }
-        self.agent_outputs.append(entry)
-        self._save_agent_outputs()
+        if task_key:
+            entry["task_key"] = task_key
+            entry["fingerprint"] = fingerprint
+        if self._agent_outputs is not None:
+            self._agent_outputs.append(entry)
+        self.agent_outputs_log.append(entry)
+        memory_index.add(self.session_id, "output", agent_name, output, entry["timestamp"],
+                         topic=self.context.get("topic", ""), task=task)
     
     def get_agent_outputs(self, agent_name: Optional[str] = None) -> List[Dict]:
         """Retrieve outputs from a specific agent or all agents"""
@@ -90,6 +130,17 @@ class StudyMemory:
             return [o for o in self.agent_outputs if o["agent"] == agent_name]
         return self.agent_outputs
     
+    def get_checkpoints(self) -> Dict[str, Dict]:
+        """Latest checkpointed output per task key"""
+        return {o["task_key"]: o for o in self.agent_outputs if o.get("task_key")}
+    
+    def get_final_report(self) -> Optional[str]:
+        """Latest coordinator report stored for this session, if any"""
+        for entry in reversed(self.agent_outputs):
+            if entry["agent"] == "Study Coordinator" and entry["task"] == "Final Report Compilation":
+                return entry["output"]
+        return None
+    
     def add_conversation_turn(self, role: str, content: str):
         """Add a conversation turn (user or assistant)"""
         entry = {
@@ -97,8 +148,11 @@ class StudyMemory:
             "content": content,
             "timestamp": datetime.now().isoformat()
         }
-        self.conversation.append(entry)
-        self._save_conversation()
+        if self._conversation is not None:
+            self._conversation.append(entry)
+        self.conversation_log.append(entry)
+        memory_index.add(self.session_id, "turn", role, content, entry["timestamp"],
+                         topic=self.context.get("topic", ""))
     
     def get_conversation_history(self, last_n: Optional[int] = None) -> List[Dict]:
         """Retrieve conversation history"""
@@ -118,6 +172,7 @@ Conversation Turns: {len(self.conversation)}
     
     def search_outputs(self, keyword: str) -> List[Dict]:
         """Search agent outputs for a specific keyword"""
+        # Substring match over this session's outputs (memory_index.search is the ranked, cross-session search)
         results = []
         for output in self.agent_outputs:
             if keyword.lower() in output["output"].lower():
@@ -126,9 +181,12 @@ Conversation Turns: {len(self.conversation)}
     
     def clear_session(self):
         """Clear all session data"""
-        self.agent_outputs = []
-        self.conversation = []
+        self._agent_outputs = []
+        self._conversation = []
         self.context["metadata"] = {}
+        self.context.pop("timings", None)
         self._save_context()
-        self._save_agent_outputs()
-        self._save_conversation()
+        self.agent_outputs_log.rewrite([])
+        self.conversation_log.rewrite([])
+        memory_index.remove_session(self.session_id)
+        memory_index.register_session(self.session_id)
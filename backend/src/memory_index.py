@@ -0,0 +1,277 @@
+import atexit
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .config.settings import settings
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    kind TEXT NOT NULL,          -- 'output' or 'turn'
+    agent TEXT,                  -- agent name, or the role for conversation turns
+    task TEXT,
+    topic TEXT,
+    topic_key TEXT,              -- normalized topic for filtering
+    content TEXT NOT NULL,
+    ts REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_session ON entries(session_id);
+CREATE INDEX IF NOT EXISTS entries_agent_ts ON entries(agent, ts);
+CREATE INDEX IF NOT EXISTS entries_topic_ts ON entries(topic_key, ts);
+CREATE INDEX IF NOT EXISTS entries_ts ON entries(ts);
+CREATE TABLE IF NOT EXISTS indexed_sessions (session_id TEXT PRIMARY KEY);
+"""
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5(
+    content, topic, agent, task, content='entries', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS entries_ai AFTER INSERT ON entries BEGIN
+    INSERT INTO entries_fts(rowid, content, topic, agent, task)
+    VALUES (new.id, new.content, new.topic, new.agent, new.task);
+END;
+CREATE TRIGGER IF NOT EXISTS entries_ad AFTER DELETE ON entries BEGIN
+    INSERT INTO entries_fts(entries_fts, rowid, content, topic, agent, task)
+    VALUES ('delete', old.id, old.content, old.topic, old.agent, old.task);
+END;
+"""
+
+
+def topic_key(topic: str) -> str:
+    return re.sub(r"\s+", " ", topic or "").strip().casefold()
+
+
+def parse_time(value) -> float:
+    """ISO timestamp or epoch seconds to epoch seconds; raises ValueError on anything else"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid timestamp: {value!r} (expected ISO 8601 or epoch seconds)") from None
+
+
+def to_epoch(value) -> float:
+    """Stored StudyMemory timestamp to epoch seconds (missing or malformed ones count as now)"""
+    try:
+        return parse_time(value)
+    except ValueError:
+        return datetime.now().timestamp()
+
+
+def fts_query(text: str) -> str:
+    """User text to a safe FTS5 query: every word must match (as a prefix)"""
+    words = re.findall(r"\w+", text)
+    return " ".join(f'"{w}"*' for w in words)
+
+
+class MemoryIndex:
+    """
+    Cross-session search over agent outputs and conversation turns.
+    One SQLite database (WAL mode) under outputs/memory with a row per stored
+    entry, B-tree indexes for agent / topic / time filters and an FTS5 table
+    for full-text search. Where SQLite was built without FTS5, text search
+    falls back to LIKE over the same table. New entries are queued and
+    inserted in one transaction per `interval` (like the session logs'
+    group commit); searches and deletes commit the queue first.
+    """
+
+    INSERT = ("INSERT INTO entries (session_id, kind, agent, task, topic, topic_key, content, ts) "
+              "VALUES (?, ?, ?, ?, ?, ?, ?, ?)")
+
+    def __init__(self, db_path: Path, interval: float = 0.05):
+        self.db_path = Path(db_path)
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.has_fts = False
+        self._pending: List[Tuple] = []
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_settings(cls, config) -> "MemoryIndex":
+        return cls(config.output_dir / "memory" / "index.db", interval=config.memory_flush_interval)
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            try:
+                conn.executescript(FTS_SCHEMA)
+                self.has_fts = True
+            except sqlite3.OperationalError:
+                print("[MEMORY_INDEX] SQLite has no FTS5; text search uses LIKE")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def add(self, session_id: str, kind: str, agent: str, content: str, timestamp,
+            topic: str = "", task: str = ""):
+        """Queue one new entry for indexing (called by StudyMemory on every append)"""
+        row = (session_id, kind, agent, task, topic, topic_key(topic), content, to_epoch(timestamp))
+        with self._cond:
+            self._pending.append(row)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="memory-indexer", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+            time.sleep(self.interval)  # let the group fill up
+            self.flush()
+
+    def _commit_pending(self):
+        """Insert queued entries in one transaction (caller holds self._lock)"""
+        with self._cond:
+            rows, self._pending = self._pending, []
+        if rows:
+            self.conn.executemany(self.INSERT, rows)
+            self.conn.commit()
+
+    def flush(self):
+        """Commit everything queued so far before returning"""
+        with self._lock:
+            self._commit_pending()
+
+    def register_session(self, session_id: str):
+        """Mark a brand-new session as covered, so backfill never re-reads it"""
+        with self._lock:
+            self.conn.execute("INSERT OR IGNORE INTO indexed_sessions VALUES (?)", (session_id,))
+            self.conn.commit()
+
+    def remove_session(self, session_id: str):
+        with self._lock:
+            self._commit_pending()
+            self.conn.execute("DELETE FROM entries WHERE session_id = ?", (session_id,))
+            self.conn.execute("DELETE FROM indexed_sessions WHERE session_id = ?", (session_id,))
+            self.conn.commit()
+
+    def search(self, query: str = "", agent: Optional[str] = None, topic: Optional[str] = None,
+               kind: Optional[str] = None, session_id: Optional[str] = None,
+               since=None, until=None, limit: int = 20, offset: int = 0,
+               include_content: bool = True) -> Dict:
+        """Newest-first (or best-match-first with a query) page of matching entries"""
+        where, params = [], []
+        if agent:
+            where.append("e.agent = ?")
+            params.append(agent)
+        if topic:
+            where.append("e.topic_key = ?")
+            params.append(topic_key(topic))
+        if kind:
+            where.append("e.kind = ?")
+            params.append(kind)
+        if session_id:
+            where.append("e.session_id = ?")
+            params.append(session_id)
+        if since is not None:
+            where.append("e.ts >= ?")
+            params.append(parse_time(since))
+        if until is not None:
+            where.append("e.ts <= ?")
+            params.append(parse_time(until))
+
+        match = fts_query(query) if query else ""
+        with self._lock:
+            self._commit_pending()  # read your own writes
+            conn = self.conn
+            if match and self.has_fts:
+                source = "entries_fts JOIN entries e ON e.id = entries_fts.rowid"
+                where.insert(0, "entries_fts MATCH ?")
+                params.insert(0, match)
+                snippet = "snippet(entries_fts, 0, '**', '**', ' … ', 24)"
+                order = "bm25(entries_fts), e.ts DESC"
+            else:
+                source = "entries e"
+                for word in re.findall(r"\w+", query or ""):
+                    where.append("e.content LIKE ?")
+                    params.append(f"%{word}%")
+                snippet = "substr(e.content, 1, 240)"
+                order = "e.ts DESC"
+            clause = f"WHERE {' AND '.join(where)}" if where else ""
+
+            total = conn.execute(f"SELECT COUNT(*) FROM {source} {clause}", params).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT e.id, e.session_id, e.kind, e.agent, e.task, e.topic, e.ts, e.content, {snippet} AS snippet "
+                f"FROM {source} {clause} ORDER BY {order} LIMIT ? OFFSET ?",
+                params + [limit, offset],
+            ).fetchall()
+
+        return {
+            "total": total,
+            "limit": limit,
+            "offset": offset,
+            "results": [
+                {
+                    "session_id": r["session_id"],
+                    "kind": r["kind"],
+                    "agent": r["agent"],
+                    "task": r["task"],
+                    "topic": r["topic"],
+                    "timestamp": datetime.fromtimestamp(r["ts"]).isoformat(),
+                    "snippet": r["snippet"],
+                    **({"content": r["content"]} if include_content else {}),
+                }
+                for r in rows
+            ],
+        }
+
+    def backfill(self, memory_root: Optional[Path] = None) -> int:
+        """Index sessions stored before the index existed; returns how many were added"""
+        from .memory import StudyMemory
+
+        memory_root = Path(memory_root or settings.output_dir / "memory")
+        with self._lock:
+            known = {r[0] for r in self.conn.execute("SELECT session_id FROM indexed_sessions")}
+        added = 0
+        for session_dir in sorted(memory_root.iterdir()):
+            session_id = session_dir.name
+            if session_id in known or not StudyMemory.session_exists(session_id):
+                continue
+            memory = StudyMemory(session_id)
+            topic = memory.context.get("topic", "")
+            rows = [
+                (session_id, "output", o["agent"], o.get("task", ""), topic, topic_key(topic), o["output"], to_epoch(o.get("timestamp")))
+                for o in memory.agent_outputs
+            ] + [
+                (session_id, "turn", t["role"], "", topic, topic_key(topic), t["content"], to_epoch(t.get("timestamp")))
+                for t in memory.conversation
+            ]
+            with self._lock:
+                self.conn.executemany(self.INSERT, rows)
+                self.conn.execute("INSERT OR IGNORE INTO indexed_sessions VALUES (?)", (session_id,))
+                self.conn.commit()
+            added += 1
+        if added:
+            print(f"[MEMORY_INDEX] Backfilled {added} sessions")
+        return added
+
+
+# Singleton instance
+memory_index = MemoryIndex.from_settings(settings)
+atexit.register(memory_index.flush)
+
+
+if __name__ == "__main__":
+    # python -m src.memory_index  -> index sessions written before the index existed
+    memory_index.backfill()
@@ -0,0 +1,208 @@
+import atexit
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .config.settings import settings
+
+
+def atomic_write_json(path: Path, data, indent: Optional[int] = 2):
+    """Write to a temp file and rename over the target, so readers never see a torn file"""
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=indent, ensure_ascii=False)
+        f.flush()
+        if settings.memory_fsync:
+            os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class GroupCommitWriter:
+    """
+    Background writer shared by every session log.
+    Appends are queued per file and written in one open/write (and optional
+    fsync) per file per interval, so a burst of turns costs a single syscall
+    round instead of one rewrite each. flush() blocks until the queue is on disk.
+    """
+
+    def __init__(self, interval: float = 0.05, fsync: bool = False):
+        self.interval = interval
+        self.fsync = fsync
+        self._pending: Dict[Path, List[str]] = defaultdict(list)
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._writing = False
+
+    def append(self, path: Path, line: str):
+        with self._cond:
+            self._pending[path].append(line)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="memory-writer", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+            time.sleep(self.interval)  # let the group fill up
+            self._write_batch()
+
+    def _write_batch(self):
+        with self._cond:
+            while self._writing:
+                self._cond.wait()
+            batch, self._pending = self._pending, defaultdict(list)
+            self._writing = True
+        try:
+            for path, lines in batch.items():
+                with open(path, "a", encoding="utf-8") as f:
+                    f.write("".join(lines))
+                    f.flush()
+                    if self.fsync:
+                        os.fsync(f.fileno())
+        finally:
+            with self._cond:
+                self._writing = False
+                self._cond.notify_all()
+
+    def flush(self):
+        """Write everything queued so far before returning"""
+        with self._cond:
+            idle = not self._pending and not self._writing
+        if not idle:
+            self._write_batch()
+
+
+class SegmentedLog:
+    """
+    Append-only JSONL record stream stored as numbered segments
+    (<name>.00001.jsonl, <name>.00002.jsonl, ...).
+    A segment rolls over once it passes `segment_max_bytes`; compaction
+    merges all sealed segments into the newest sealed one, whose first line
+    marks it as holding everything before it, so segments a crash left behind
+    are ignored instead of duplicated. A torn final line from a crash is skipped when reading.
+    """
+
+    COMPACTED_KEY = "_compacted_from"
+
+    def __init__(self, directory: Path, name: str, writer: GroupCommitWriter,
+                 segment_max_bytes: int = 1024 * 1024, max_segments: int = 8):
+        self.directory = Path(directory)
+        self.name = name
+        self.writer = writer
+        self.segment_max_bytes = segment_max_bytes
+        self.max_segments = max_segments
+        self._lock = threading.Lock()
+        writer.flush()
+        sequences = self._sequences()
+        self._active = sequences[-1] if sequences else 1
+        active_path = self._path(self._active)
+        self._active_bytes = active_path.stat().st_size if active_path.exists() else 0
+
+    def _path(self, seq: int) -> Path:
+        return self.directory / f"{self.name}.{seq:05d}.jsonl"
+
+    def _sequences(self) -> List[int]:
+        sequences = []
+        for path in self.directory.glob(f"{self.name}.*.jsonl"):
+            try:
+                sequences.append(int(path.name[len(self.name) + 1:-len(".jsonl")]))
+            except ValueError:
+                continue
+        return sorted(sequences)
+
+    def exists(self) -> bool:
+        return bool(self._sequences())
+
+    def append(self, record: Dict):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._active_bytes and self._active_bytes + len(line) > self.segment_max_bytes:
+                self.writer.flush()
+                self._active += 1
+                self._active_bytes = 0
+                if len(self._sequences()) >= self.max_segments:
+                    self._compact_locked()
+            self._active_bytes += len(line.encode("utf-8"))
+            self.writer.append(self._path(self._active), line)
+
+    def read_all(self, upto: Optional[int] = None) -> List[Dict]:
+        """Every record in order (segments after `upto` are left out)"""
+        self.writer.flush()
+        records: List[Dict] = []
+        origin: List[int] = []  # segment each record came from
+        for seq in self._sequences():
+            if upto is not None and seq > upto:
+                break
+            with open(self._path(seq), "r", encoding="utf-8") as f:
+                lines = f.read().split("\n")
+            for line in lines:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # torn write at the tail of a segment
+                if isinstance(record, dict) and self.COMPACTED_KEY in record:
+                    # This segment already holds everything from that sequence on
+                    keep = [i for i, s in enumerate(origin) if s < record[self.COMPACTED_KEY]]
+                    records = [records[i] for i in keep]
+                    origin = [origin[i] for i in keep]
+                    continue
+                records.append(record)
+                origin.append(seq)
+        return records
+
+    def _write_compacted(self, seq: int, records: List[Dict]):
+        """Atomically make segment `seq` hold the whole history, then drop older segments"""
+        path = self._path(seq)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            # Compaction always starts from the first segment, so the header covers 1..seq
+            f.write(json.dumps({self.COMPACTED_KEY: 1}) + "\n")
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            if self.writer.fsync:
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        for old in self._sequences():
+            if old < seq:
+                self._path(old).unlink(missing_ok=True)
+
+    def _compact_locked(self):
+        sealed = self._sequences()
+        if len(sealed) < 2:
+            return
+        # Appends continue in a fresh segment after the merged one
+        self._active = max(self._active, sealed[-1] + 1)
+        self._active_bytes = 0
+        records = self.read_all(upto=sealed[-1])
+        self._write_compacted(sealed[-1], records)
+
+    def compact(self):
+        """Merge sealed segments into one (new appends go to a fresh segment)"""
+        with self._lock:
+            self.writer.flush()
+            self._compact_locked()
+
+    def rewrite(self, records: List[Dict]):
+        """Replace the whole stream (used when a session is cleared or migrated)"""
+        with self._lock:
+            self.writer.flush()
+            sequences = self._sequences()
+            last = max(sequences[-1] if sequences else 1, self._active)
+            self._write_compacted(last, records)
+            self._active = last + 1
+            self._active_bytes = 0
+
+
+# Singleton instance
+memory_writer = GroupCommitWriter(settings.memory_flush_interval, settings.memory_fsync)
+atexit.register(memory_writer.flush)
@@ -0,0 +1,312 @@
+import asyncio
+import bisect
+import functools
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Seconds; spans a cached lookup up to a quota sleep or a full agent task
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+# Agent whose task is running in this thread / task (set by the task executor)
+current_agent: ContextVar[str] = ContextVar("smartstudy_agent", default="unattributed")
+# Timing breakdown of the crew run this code belongs to
+current_run: ContextVar[Optional["RunTimings"]] = ContextVar("smartstudy_run_timings", default=None)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonic counter per label combination"""
+
+    def __init__(self, name: str, help_text: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1.0):
+        with self._lock:
+            self._values[tuple(label_values)] += amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for values, total in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, values)} {total:g}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label combination (Prometheus semantics)"""
+
+    def __init__(self, name: str, help_text: str, labels: Iterable[str] = (), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # per-bucket counts (last slot = +Inf), sum, count
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for values, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, n in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += n
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    labels = _format_labels(self.labels, values, f'le="{le}"')
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labels, values)} {total:.6f}")
+                lines.append(f"{self.name}_count{_format_labels(self.labels, values)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Process-wide set of metrics, rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics: List = []
+
+    def counter(self, name: str, help_text: str, labels: Iterable[str] = ()) -> Counter:
+        metric = Counter(name, help_text, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help_text: str, labels: Iterable[str] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, help_text, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Singleton instance
+metrics = MetricsRegistry()
+
+LLM_CALL_SECONDS = metrics.histogram(
+    "smartstudy_llm_call_seconds", "Agent-visible LLM call time, including cache lookup, queueing and retries",
+    ("agent", "model", "cached"))
+LLM_REQUEST_SECONDS = metrics.histogram(
+    "smartstudy_llm_request_seconds", "Time spent inside single Gemini requests", ("agent", "model", "status"))
+LLM_WAIT_SECONDS = metrics.histogram(
+    "smartstudy_llm_wait_seconds", "Time LLM calls spent waiting: quota admission/backoff or pool cooldown",
+    ("agent", "model", "reason"))
+LLM_TOKENS = metrics.counter(
+    "smartstudy_llm_tokens_total", "Tokens reported by Gemini", ("agent", "model", "kind"))
+LLM_RETRIES = metrics.counter(
+    "smartstudy_llm_retries_total", "LLM attempts repeated after a quota error", ("agent", "model", "reason"))
+CACHE_LOOKUPS = metrics.counter(
+    "smartstudy_cache_lookups_total", "Response and search cache lookups", ("cache", "result"))
+TASK_SECONDS = metrics.histogram(
+    "smartstudy_task_seconds", "Wall time of each CrewAI task", ("agent", "status"))
+TOOL_SECONDS = metrics.histogram(
+    "smartstudy_tool_seconds", "Wall time of each tool call", ("agent", "tool"))
+PHASE_SECONDS = metrics.histogram(
+    "smartstudy_phase_seconds", "Wall time of non-agent phases (upload extraction, note condensing, retrieval)",
+    ("phase",))
+
+
+class RunTimings:
+    """
+    Where one crew run's time went, per agent, tool and phase.
+    Shared by every thread of the run through the `current_run` context
+    variable and stored in the session's StudyMemory when the run ends.
+    """
+
+    AGENT_FIELDS = ("task_seconds", "llm_calls", "llm_seconds", "request_seconds", "wait_seconds",
+                    "retries", "prompt_tokens", "completion_tokens", "cache_hits")
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.agents: Dict[str, Dict[str, float]] = defaultdict(lambda: dict.fromkeys(self.AGENT_FIELDS, 0))
+        self.tools: Dict[str, Dict[str, float]] = defaultdict(lambda: {"calls": 0, "seconds": 0.0})
+        self.phases: Dict[str, float] = defaultdict(float)
+        self.caches: Dict[str, Dict[str, int]] = defaultdict(lambda: {"hit": 0, "miss": 0})
+        self._lock = threading.Lock()
+
+    def add_agent(self, agent: str, **fields: float):
+        with self._lock:
+            stats = self.agents[agent]
+            for field, value in fields.items():
+                stats[field] += value
+
+    def add_tool(self, tool: str, seconds: float):
+        with self._lock:
+            self.tools[tool]["calls"] += 1
+            self.tools[tool]["seconds"] += seconds
+
+    def add_phase(self, name: str, seconds: float):
+        with self._lock:
+            self.phases[name] += seconds
+
+    def add_cache(self, cache: str, result: str):
+        with self._lock:
+            self.caches[cache][result] += 1
+
+    def snapshot(self) -> Dict:
+        def rounded(stats: Dict) -> Dict:
+            return {k: round(v, 4) if isinstance(v, float) else v for k, v in stats.items()}
+
+        with self._lock:
+            return {
+                "wall_seconds": round(time.monotonic() - self.started, 4),
+                "agents": {name: rounded(stats) for name, stats in self.agents.items()},
+                "tools": {name: rounded(stats) for name, stats in self.tools.items()},
+                "phases": rounded(dict(self.phases)),
+                "caches": {name: dict(stats) for name, stats in self.caches.items()},
+            }
+
+
+@contextmanager
+def track_run():
+    """Collect the timing breakdown of the code run inside (and threads copying its context)"""
+    timings = RunTimings()
+    token = current_run.set(timings)
+    try:
+        yield timings
+    finally:
+        current_run.reset(token)
+
+
+@contextmanager
+def agent_scope(agent: str):
+    """Attribute LLM and tool metrics recorded inside to `agent`"""
+    token = current_agent.set(agent)
+    try:
+        yield
+    finally:
+        current_agent.reset(token)
+
+
+@contextmanager
+def timed_task(agent: str):
+    status = "error"
+    started = time.monotonic()
+    with agent_scope(agent):
+        try:
+            yield
+            status = "ok"
+        finally:
+            elapsed = time.monotonic() - started
+            TASK_SECONDS.observe(elapsed, agent, status)
+            run = current_run.get()
+            if run is not None:
+                run.add_agent(agent, task_seconds=elapsed)
+
+
+@contextmanager
+def phase(name: str):
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        elapsed = time.monotonic() - started
+        PHASE_SECONDS.observe(elapsed, name)
+        run = current_run.get()
+        if run is not None:
+            run.add_phase(name, elapsed)
+
+
+def _record_tool(tool: str, elapsed: float):
+    agent = current_agent.get()
+    TOOL_SECONDS.observe(elapsed, agent, tool)
+    run = current_run.get()
+    if run is not None:
+        run.add_tool(tool, elapsed)
+
+
+def timed_tool(method):
+    """Decorator for a BaseTool's _run / _arun: records the call under the tool's name"""
+    if asyncio.iscoroutinefunction(method):
+        @functools.wraps(method)
+        async def async_wrapper(self, *args, **kwargs):
+            started = time.monotonic()
+            try:
+                return await method(self, *args, **kwargs)
+            finally:
+                _record_tool(self.name, time.monotonic() - started)
+        return async_wrapper
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        started = time.monotonic()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            _record_tool(self.name, time.monotonic() - started)
+    return wrapper
+
+
+def record_llm_call(model: str, seconds: float, cached: bool):
+    agent = current_agent.get()
+    LLM_CALL_SECONDS.observe(seconds, agent, model, "true" if cached else "false")
+    run = current_run.get()
+    if run is not None:
+        run.add_agent(agent, llm_calls=1, llm_seconds=seconds, cache_hits=int(cached))
+
+
+def record_llm_request(model: str, seconds: float, ok: bool, usage: Optional[Dict] = None):
+    agent = current_agent.get()
+    LLM_REQUEST_SECONDS.observe(seconds, agent, model, "ok" if ok else "error")
+    prompt_tokens = (usage or {}).get("input_tokens", 0)
+    completion_tokens = (usage or {}).get("output_tokens", 0)
+    if prompt_tokens:
+        LLM_TOKENS.inc(agent, model, "prompt", amount=prompt_tokens)
+    if completion_tokens:
+        LLM_TOKENS.inc(agent, model, "completion", amount=completion_tokens)
+    run = current_run.get()
+    if run is not None:
+        run.add_agent(agent, request_seconds=seconds, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+
+
+def record_llm_wait(model: str, seconds: float, reason: str):
+    agent = current_agent.get()
+    LLM_WAIT_SECONDS.observe(seconds, agent, model, reason)
+    run = current_run.get()
+    if run is not None:
+        run.add_agent(agent, wait_seconds=seconds)
+
+
+def record_llm_retry(model: str, reason: str):
+    agent = current_agent.get()
+    LLM_RETRIES.inc(agent, model, reason)
+    run = current_run.get()
+    if run is not None:
+        run.add_agent(agent, retries=1)
+
+
+def record_cache(cache: str, hit: bool):
+    result = "hit" if hit else "miss"
+    CACHE_LOOKUPS.inc(cache, result)
+    run = current_run.get()
+    if run is not None:
+        run.add_cache(cache, result)
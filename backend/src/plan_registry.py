@@ -0,0 +1,88 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .config.settings import settings
+from .streaming import RunChannel
+
+
+class PlanRegistry:
+    """
+    Recognises duplicate (topic, notes) submissions.
+    Finished plans are indexed by request fingerprint -> session id on disk;
+    plans still running are tracked in-process so duplicates attach to them.
+    """
+
+    def __init__(self, index_file: Path):
+        self.index_file = Path(index_file)
+        self._running: Dict[str, RunChannel] = {}
+        self._lock = threading.Lock()
+        self._index = self._load_index()
+
+    @staticmethod
+    def normalize(topic: str, notes: str) -> Tuple[str, str]:
+        """Case- and whitespace-insensitive form of a request"""
+        return (
+            re.sub(r"\s+", " ", topic).strip().casefold(),
+            re.sub(r"\s+", " ", notes).strip(),
+        )
+
+    @classmethod
+    def fingerprint(cls, topic: str, notes: str, material_ids: Optional[List[str]] = None) -> str:
+        """Retrieval is scoped by material_ids, so they are part of the request's identity"""
+        norm_topic, norm_notes = cls.normalize(topic, notes)
+        parts = [norm_topic, norm_notes]
+        if material_ids:  # unscoped requests keep their existing fingerprints
+            parts.append(sorted(set(material_ids)))
+        payload = json.dumps(parts, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _load_index(self) -> Dict[str, str]:
+        try:
+            with open(self.index_file, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self):
+        self.index_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_file.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._index, f, indent=2)
+        os.replace(tmp_path, self.index_file)
+
+    def attach_or_start(self, fingerprint: str) -> Tuple[RunChannel, bool]:
+        """Return the running channel for this request, creating it if needed (True = caller must run the crew)"""
+        with self._lock:
+            channel = self._running.get(fingerprint)
+            if channel is not None:
+                return channel, False
+            channel = RunChannel()
+            self._running[fingerprint] = channel
+            return channel, True
+
+    def finish(self, fingerprint: str, session_id: Optional[str] = None):
+        """Detach the running channel; record the session when the run succeeded"""
+        with self._lock:
+            self._running.pop(fingerprint, None)
+            if session_id:
+                self._index[fingerprint] = session_id
+                self._save_index()
+
+    def finished_session(self, fingerprint: str) -> Optional[str]:
+        with self._lock:
+            return self._index.get(fingerprint)
+
+    def forget(self, fingerprint: str):
+        """Drop a stale index entry (e.g. its session was deleted)"""
+        with self._lock:
+            if self._index.pop(fingerprint, None) is not None:
+                self._save_index()
+
+
+# Singleton instance
+plan_registry = PlanRegistry(settings.output_dir / "memory" / "plan_index.json")
@@ -100,3 +100,29 @@ def get_study_prompts(topic: str, notes: str) -> dict:
             f"   - Description: [One sentence]\n"
         )
     }
+
+
+def get_chunk_summary_prompt(topic: str, chunk: str, index: int, total: int) -> str:
+    """Map step: condense one slice of long study materials"""
+    return (
+        f"You are condensing part {index} of {total} of study materials about {topic}.\n\n"
+        f"{chunk}\n\n"
+        f"Requirements:\n"
+        f"- Keep every key concept, definition and formula from this part\n"
+        f"- Mark exam-critical points with (HIGH-YIELD)\n"
+        f"- Drop examples, anecdotes and repetition\n"
+        f"- Use terse markdown bullet points, no introduction\n"
+    )
+
+
+def get_reduce_prompt(topic: str, partials: list) -> str:
+    """Reduce step: merge condensed parts into one digest"""
+    joined = "\n\n---\n\n".join(partials)
+    return (
+        f"Merge these condensed notes about {topic} into a single digest.\n\n"
+        f"{joined}\n\n"
+        f"Requirements:\n"
+        f"- Remove duplicates across parts, keep the original order of topics\n"
+        f"- Keep every (HIGH-YIELD) marker, definition and formula\n"
+        f"- Use markdown headings per topic and bullet points beneath\n"
+    )
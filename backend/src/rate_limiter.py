@@ -0,0 +1,198 @@
+import hashlib
+import random
+import re
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from .config.settings import settings
+
+# Gemini phrases its hint as "Please retry in 34.5s" or `retryDelay: "34s"`
+RETRY_AFTER_PATTERN = re.compile(
+    r'retry(?:[ _-]?(?:in|after)|_?delay|Delay)[^0-9]{0,20}(\d+(?:\.\d+)?)',
+    re.IGNORECASE
+)
+
+
+def is_quota_error(error: Exception) -> bool:
+    """True for 429 / RESOURCE_EXHAUSTED responses"""
+    err = str(error).upper()
+    return "429" in err or "RESOURCE_EXHAUSTED" in err
+
+
+def parse_retry_after(error: Exception) -> Optional[float]:
+    """Extract the server's retry hint (seconds) from a quota error, if any"""
+    hint = getattr(error, "retry_after", None)
+    if isinstance(hint, (int, float)):
+        return float(hint)
+    match = RETRY_AFTER_PATTERN.search(str(error))
+    return float(match.group(1)) if match else None
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token)"""
+    return max(1, len(text) // 4)
+
+
+def key_fingerprint(api_key: Optional[str]) -> str:
+    """Stable, non-reversible id for an API key (safe to log)"""
+    return hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:12]
+
+
+class TokenBucket:
+    """Classic token bucket: `capacity` tokens refilled evenly over `period` seconds"""
+
+    def __init__(self, capacity: float, period: float):
+        self.capacity = float(capacity)
+        self.rate = self.capacity / period
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` tokens are available (0 if available now)"""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float):
+        # May go negative when actual usage exceeds the estimate; refill repays it
+        self.tokens -= amount
+
+
+class KeyQuota:
+    """RPM, TPM and RPD buckets for one (API key, model) pair"""
+
+    def __init__(self, rpm: int, tpm: int, rpd: int):
+        self.rpm = TokenBucket(rpm, 60)
+        self.tpm = TokenBucket(tpm, 60)
+        self.rpd = TokenBucket(rpd, 86400)
+        self.blocked_until = 0.0
+        self.waiting = 0
+
+    def wait_time(self, tokens: int, now: float) -> float:
+        return max(
+            self.blocked_until - now,
+            self.rpm.wait_time(1, now),
+            self.tpm.wait_time(tokens, now),
+            self.rpd.wait_time(1, now),
+        )
+
+
+class QuotaScheduler:
+    """
+    Process-wide admission control for LLM calls.
+    Every QuotaSafeLLM in every session draws from the same buckets, so
+    concurrent requests sharing a key coordinate instead of racing into 429s.
+    """
+
+    def __init__(self, rpm: int, tpm: int, rpd: int, backoff_base: float = 2.0, backoff_max: float = 60.0):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.rpd = rpd
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._quotas: Dict[Tuple[str, str], KeyQuota] = {}
+        self._cond = threading.Condition()
+
+    @classmethod
+    def from_settings(cls, config) -> "QuotaScheduler":
+        return cls(
+            rpm=config.llm_rpm,
+            tpm=config.llm_tpm,
+            rpd=config.llm_rpd,
+            backoff_base=config.llm_backoff_base,
+            backoff_max=config.llm_backoff_max,
+        )
+
+    def _quota(self, key_id: str, model: str) -> KeyQuota:
+        quota = self._quotas.get((key_id, model))
+        if quota is None:
+            quota = KeyQuota(self.rpm, self.tpm, self.rpd)
+            self._quotas[(key_id, model)] = quota
+        return quota
+
+    def acquire(self, key_id: str, model: str, tokens: int = 1) -> float:
+        """Block until the call fits every bucket, then reserve it. Returns seconds waited."""
+        started = time.monotonic()
+        with self._cond:
+            quota = self._quota(key_id, model)
+            quota.waiting += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    delay = quota.wait_time(tokens, now)
+                    if delay <= 0:
+                        quota.rpm.consume(1)
+                        quota.tpm.consume(tokens)
+                        quota.rpd.consume(1)
+                        return now - started
+                    # Woken early by penalize()/record_usage(); otherwise sleep exactly as long as needed
+                    self._cond.wait(timeout=delay)
+            finally:
+                quota.waiting -= 1
+
+    def record_usage(self, key_id: str, model: str, estimated: int, actual: Optional[int]):
+        """Correct the TPM bucket once the real token count is known"""
+        if actual is None:
+            return
+        with self._cond:
+            bucket = self._quota(key_id, model).tpm
+            bucket.tokens = min(bucket.capacity, bucket.tokens + estimated - actual)
+            self._cond.notify_all()
+
+    def penalize(self, key_id: str, model: str, delay: float):
+        """Hold every caller of this key/model for `delay` seconds after a 429"""
+        with self._cond:
+            quota = self._quota(key_id, model)
+            quota.blocked_until = max(quota.blocked_until, time.monotonic() + delay)
+            self._cond.notify_all()
+
+    def backoff_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Exponential backoff with equal jitter (half the ceiling, plus up to half again); a server hint wins when present"""
+        if retry_after is not None:
+            return retry_after + random.uniform(0, 1)
+        ceiling = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return random.uniform(ceiling / 2, ceiling)
+
+    def remaining(self, key_id: str, model: str) -> Dict[str, float]:
+        """Tokens left in each bucket right now"""
+        with self._cond:
+            quota = self._quota(key_id, model)
+            now = time.monotonic()
+            for bucket in (quota.rpm, quota.tpm, quota.rpd):
+                bucket._refill(now)
+            return {
+                "rpm": quota.rpm.tokens,
+                "tpm": quota.tpm.tokens,
+                "rpd": quota.rpd.tokens,
+                "blocked_for": max(0.0, quota.blocked_until - now),
+            }
+
+    def queue_depth(self, key_id: Optional[str] = None) -> int:
+        """Number of calls currently waiting for admission"""
+        with self._cond:
+            return sum(
+                q.waiting for (k, _), q in self._quotas.items()
+                if key_id is None or k == key_id
+            )
+
+    def stats(self) -> Dict:
+        keys = list(self._quotas)
+        return {
+            "queue_depth": self.queue_depth(),
+            "limits": {"rpm": self.rpm, "tpm": self.tpm, "rpd": self.rpd},
+            "keys": [
+                {"key": k, "model": m, "waiting": self._quotas[(k, m)].waiting, **self.remaining(k, m)}
+                for k, m in keys
+            ],
+        }
+
+
+# Singleton instance
+quota_scheduler = QuotaScheduler.from_settings(settings)
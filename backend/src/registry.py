@@ -0,0 +1,88 @@
+import os
+import threading
+from pathlib import Path
+from types import MappingProxyType
+from typing import Dict, Mapping, Tuple, Type
+
+import yaml
+
+from .config.settings import settings
+
+CONFIG_DIR = Path(__file__).parent / "config"
+
+
+def freeze(value):
+    """Read-only view of parsed YAML (mappings become MappingProxyType, lists tuples)"""
+    if isinstance(value, dict):
+        return MappingProxyType({k: freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+class ConfigRegistry:
+    """
+    Warm, process-wide home of the YAML agent/task configs and shared tools.
+    Each file is parsed once and again only when its mtime changes, so a
+    request costs a stat() instead of a YAML parse, and every crew gets the
+    same read-only mappings. Stateless tools are built once and shared by
+    all agents of all requests.
+    """
+
+    def __init__(self, config_dir: Path, hot_reload: bool = True):
+        self.config_dir = Path(config_dir)
+        self.hot_reload = hot_reload
+        self._files: Dict[str, Tuple[float, Mapping]] = {}
+        self._tools: Dict[Type, object] = {}
+        self._lock = threading.Lock()
+        self.reloads = 0
+
+    @classmethod
+    def from_settings(cls, config) -> "ConfigRegistry":
+        return cls(CONFIG_DIR, hot_reload=config.config_hot_reload)
+
+    def _load(self, name: str) -> Mapping:
+        path = self.config_dir / name
+        cached = self._files.get(name)
+        if cached is not None and not self.hot_reload:
+            return cached[1]
+        mtime = os.stat(path).st_mtime
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        with self._lock:
+            cached = self._files.get(name)
+            if cached is None or cached[0] != mtime:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = freeze(yaml.safe_load(f) or {})
+                if cached is not None:
+                    self.reloads += 1
+                    print(f"[REGISTRY] {name} changed on disk; reloaded")
+                cached = self._files[name] = (mtime, data)
+            return cached[1]
+
+    def tasks(self) -> Mapping:
+        """tasks.yaml: task name -> read-only task config"""
+        return self._load("tasks.yaml")
+
+    def agents(self) -> Mapping:
+        """agents.yaml: agent key -> read-only persona (role, goal, backstory)"""
+        return self._load("agents.yaml")
+
+    def tool(self, tool_cls: Type):
+        """Shared instance of a stateless tool"""
+        tool = self._tools.get(tool_cls)
+        if tool is None:
+            with self._lock:
+                tool = self._tools.setdefault(tool_cls, tool_cls())
+        return tool
+
+    def stats(self) -> Dict:
+        return {
+            "files": {name: mtime for name, (mtime, _) in self._files.items()},
+            "reloads": self.reloads,
+            "shared_tools": sorted(cls.__name__ for cls in self._tools),
+        }
+
+
+# Singleton instance
+config_registry = ConfigRegistry.from_settings(settings)
@@ -0,0 +1,338 @@
+import bisect
+import json
+import math
+import re
+import threading
+from collections import Counter
+from itertools import chain
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .chunking import chunk_text
+from .config.settings import settings
+from .material_store import material_store
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were which with".split()
+)
+
+# What each task looks for in the materials (the topic is appended)
+TASK_QUERIES = {
+    "plan_passages": "overview outline chapters key topics",
+    "quiz_passages": "definition theorem formula example misconception",
+    "resource_passages": "difficult advanced further reading references",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS and len(t) > 1]
+
+
+class BM25Index:
+    """
+    In-memory Okapi BM25 over passages.
+    Postings are kept per term and turned into NumPy arrays on first use, so a
+    query costs one vectorized update per query term instead of a Python loop
+    over every passage. Adding passages only invalidates the array cache.
+    Postings can be exported in CSR form and reloaded as a read-only index
+    (used by the prebuilt resource catalog).
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.passages: List[Dict] = []
+        self._postings: Dict[str, Tuple[List[int], List[int]]] = {}
+        self._lengths: List[int] = []
+        self._arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._length_array: Optional[np.ndarray] = None
+        self._csr: Optional[Tuple[Dict[str, int], np.ndarray, np.ndarray, np.ndarray]] = None
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.passages)
+
+    def add(self, passages: Iterable[Dict]):
+        if self._csr is not None:
+            raise RuntimeError("A prebuilt BM25 index is read-only; rebuild it instead")
+        with self._lock:
+            for passage in passages:
+                pid = len(self.passages)
+                terms = Counter(tokenize(passage["text"]))
+                for term, tf in terms.items():
+                    ids, tfs = self._postings.setdefault(term, ([], []))
+                    ids.append(pid)
+                    tfs.append(tf)
+                self.passages.append(passage)
+                self._lengths.append(sum(terms.values()))
+            self._arrays.clear()
+            self._length_array = None
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """Postings as CSR arrays (term list, indptr, passage ids, term frequencies) plus lengths"""
+        with self._lock:
+            terms = sorted(self._postings)
+            counts = np.fromiter((len(self._postings[t][0]) for t in terms), dtype=np.int64, count=len(terms))
+            indptr = np.concatenate(([0], np.cumsum(counts)))
+            return {
+                "terms": np.frombuffer("\n".join(terms).encode("utf-8"), dtype=np.uint8),
+                "indptr": indptr,
+                "ids": np.fromiter(chain.from_iterable(self._postings[t][0] for t in terms), dtype=np.int32, count=int(indptr[-1])),
+                "tfs": np.fromiter(chain.from_iterable(self._postings[t][1] for t in terms), dtype=np.float32, count=int(indptr[-1])),
+                "lengths": np.asarray(self._lengths, dtype=np.float32),
+            }
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], passages: List[Dict]) -> "BM25Index":
+        """Read-only index over postings saved with to_arrays"""
+        index = cls()
+        index.passages = passages
+        terms = bytes(arrays["terms"]).decode("utf-8").split("\n") if len(arrays["terms"]) else []
+        index._csr = ({t: i for i, t in enumerate(terms)}, arrays["indptr"], arrays["ids"], arrays["tfs"])
+        index._length_array = np.asarray(arrays["lengths"], dtype=np.float32)
+        return index
+
+    def _term_arrays(self, term: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        if self._csr is not None:
+            positions, indptr, ids, tfs = self._csr
+            i = positions.get(term)
+            if i is None:
+                return None
+            return ids[indptr[i]:indptr[i + 1]], tfs[indptr[i]:indptr[i + 1]]
+        if term not in self._arrays:
+            postings = self._postings.get(term)
+            if postings is None:
+                return None
+            self._arrays[term] = (np.asarray(postings[0], dtype=np.int64), np.asarray(postings[1], dtype=np.float32))
+        return self._arrays[term]
+
+    def scores(self, query: str) -> np.ndarray:
+        """BM25 score of every passage for the query"""
+        with self._lock:
+            n = len(self.passages)
+            scores = np.zeros(n, dtype=np.float32)
+            if n == 0:
+                return scores
+            if self._length_array is None:
+                self._length_array = np.asarray(self._lengths, dtype=np.float32)
+            lengths = self._length_array
+            norm = self.k1 * (1 - self.b + self.b * lengths / max(lengths.mean(), 1.0))
+            for term in set(tokenize(query)):
+                arrays = self._term_arrays(term)
+                if arrays is None:
+                    continue
+                ids, tf = arrays
+                idf = math.log(1 + (n - len(ids) + 0.5) / (len(ids) + 0.5))
+                scores[ids] += idf * tf * (self.k1 + 1) / (tf + norm[ids])
+            return scores
+
+    def search(self, query: str, k: int = 5, digests: Optional[Iterable[str]] = None) -> List[Tuple[float, Dict]]:
+        scores = self.scores(query)
+        if digests is not None:
+            allowed = set(digests)
+            scores[[i for i, p in enumerate(self.passages) if p.get("sha256") not in allowed]] = 0
+        top = np.argsort(-scores)[:k]
+        return [(float(scores[i]), self.passages[i]) for i in top if scores[i] > 0]
+
+
+def split_passages(text: str, max_tokens: int, page_offsets: Optional[List[int]] = None, **meta) -> List[Dict]:
+    """Chunk a document into passages tagged with their (1-based) page"""
+    passages = []
+    position = 0
+    for chunk in chunk_text(text, max_tokens, page_offsets):
+        start = text.find(chunk, position)
+        position = max(position, start)
+        page = bisect.bisect_right(page_offsets, start) if page_offsets else None
+        passages.append({**meta, "page": page, "text": chunk.strip()})
+    return passages
+
+
+class MaterialIndex:
+    """
+    Persistent retrieval index over uploaded materials (outputs/index).
+    Each upload is split into passages once and appended to passages.jsonl, so
+    indexing is incremental; the BM25 postings are rebuilt from that file on
+    first use after a restart. When RETRIEVAL_EMBEDDING_MODEL names a
+    sentence-transformers model (and the package is installed) passage
+    vectors are stored too and blended into the ranking.
+    """
+
+    def __init__(self, root: Path, passage_tokens: int = 200, embedding_model: str = ""):
+        self.root = Path(root)
+        self.passage_tokens = passage_tokens
+        self.embedding_model = embedding_model
+        self.bm25 = BM25Index()
+        self.digests: set = set()
+        self._vectors: Dict[str, np.ndarray] = {}
+        self._encoder = None
+        self._loaded = False
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_settings(cls, config) -> "MaterialIndex":
+        return cls(config.output_dir / "index", config.retrieval_passage_tokens, config.retrieval_embedding_model)
+
+    @property
+    def passages_file(self) -> Path:
+        return self.root / "passages.jsonl"
+
+    def _vector_file(self, digest: str) -> Path:
+        return self.root / "vectors" / f"{digest}.npy"
+
+    def _load_encoder(self):
+        """Optional local embeddings; BM25 alone when the model or package is unavailable"""
+        if self._encoder is None and self.embedding_model:
+            try:
+                from sentence_transformers import SentenceTransformer
+                self._encoder = SentenceTransformer(self.embedding_model)
+            except ImportError:
+                print("[INDEX] sentence-transformers not installed; using BM25 only")
+                self.embedding_model = ""
+        return self._encoder
+
+    def _ensure_loaded(self):
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            if not self.passages_file.exists():
+                return
+            with open(self.passages_file, "r", encoding="utf-8") as f:
+                passages = [json.loads(line) for line in f if line.strip()]
+            self.bm25.add(passages)
+            self.digests.update(p["sha256"] for p in passages)
+            for digest in self.digests:
+                if self._vector_file(digest).exists():
+                    self._vectors[digest] = np.load(self._vector_file(digest))
+
+    def add_material(self, record: Dict) -> int:
+        """Index one stored extraction (no-op if these bytes are already indexed)"""
+        self._ensure_loaded()
+        digest = record["sha256"]
+        with self._lock:
+            if digest in self.digests:
+                return 0
+            passages = split_passages(
+                record["text"], self.passage_tokens, record.get("page_offsets"),
+                sha256=digest, filename=record.get("filename", "")
+            )
+            passages = [p for p in passages if p["text"]]
+            self.root.mkdir(parents=True, exist_ok=True)
+            with open(self.passages_file, "a", encoding="utf-8") as f:
+                for passage in passages:
+                    f.write(json.dumps(passage, ensure_ascii=False) + "\n")
+            self.bm25.add(passages)
+            self.digests.add(digest)
+
+            encoder = self._load_encoder()
+            if encoder is not None and passages:
+                vectors = encoder.encode([p["text"] for p in passages], normalize_embeddings=True)
+                self._vector_file(digest).parent.mkdir(parents=True, exist_ok=True)
+                np.save(self._vector_file(digest), vectors)
+                self._vectors[digest] = vectors
+        print(f"[INDEX] {record.get('filename', digest[:12])}: {len(passages)} passages indexed")
+        return len(passages)
+
+    def remove_material(self, digest: str):
+        """Drop an evicted upload: rewrite the passage file and rebuild postings"""
+        self._ensure_loaded()
+        with self._lock:
+            if digest not in self.digests:
+                return
+            kept = [p for p in self.bm25.passages if p["sha256"] != digest]
+            tmp_path = self.passages_file.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for passage in kept:
+                    f.write(json.dumps(passage, ensure_ascii=False) + "\n")
+            tmp_path.replace(self.passages_file)
+            self.bm25 = BM25Index()
+            self.bm25.add(kept)
+            self.digests.discard(digest)
+            self._vectors.pop(digest, None)
+            self._vector_file(digest).unlink(missing_ok=True)
+
+    def _dense_scores(self, query: str) -> Optional[np.ndarray]:
+        encoder = self._load_encoder()
+        if encoder is None or not self._vectors:
+            return None
+        query_vector = encoder.encode([query], normalize_embeddings=True)[0]
+        scores = np.zeros(len(self.bm25), dtype=np.float32)
+        offsets: Dict[str, int] = {}
+        for i, passage in enumerate(self.bm25.passages):
+            digest = passage["sha256"]
+            vectors = self._vectors.get(digest)
+            if vectors is not None:
+                j = offsets.get(digest, 0)
+                scores[i] = float(vectors[j] @ query_vector)
+                offsets[digest] = j + 1
+        return scores
+
+    def search(self, query: str, k: int = 5, digests: Optional[Iterable[str]] = None) -> List[Dict]:
+        self._ensure_loaded()
+        with self._lock:
+            scores = self.bm25.scores(query)
+            dense = self._dense_scores(query)
+            if dense is not None and scores.max() > 0:
+                scores = scores / scores.max() + np.clip(dense, 0, None)
+            if digests is not None:
+                allowed = set(digests)
+                scores[[i for i, p in enumerate(self.bm25.passages) if p["sha256"] not in allowed]] = 0
+            top = np.argsort(-scores)[:k]
+            return [{**self.bm25.passages[i], "score": float(scores[i])} for i in top if scores[i] > 0]
+
+
+    def indexed(self, digests: Iterable[str]) -> List[str]:
+        """The given digests that are still indexed (client-supplied ids may be unknown or evicted)"""
+        self._ensure_loaded()
+        with self._lock:
+            return [d for d in digests if d in self.digests]
+
+    def opening_passages(self, digests: List[str], k: int = 5) -> List[Dict]:
+        """First k passages of these materials, in the given order (fallback when a search matches nothing)"""
+        self._ensure_loaded()
+        with self._lock:
+            by_digest: Dict[str, List[Dict]] = {}
+            for passage in self.bm25.passages:
+                by_digest.setdefault(passage["sha256"], []).append(passage)
+        return [p for digest in digests for p in by_digest.get(digest, [])][:k]
+
+
+def format_passages(passages: List[Dict]) -> str:
+    if not passages:
+        return "(no matching passages in the uploaded materials)"
+    lines = []
+    for p in passages:
+        source = p.get("filename") or "notes"
+        if p.get("page"):
+            source += f", p.{p['page']}"
+        lines.append(f"[{source}] {p['text']}")
+    return "\n\n".join(lines)
+
+
+def notes_search(notes: str, k: int) -> Callable[[str], List[Dict]]:
+    """Query function over an ad-hoc BM25 index of the submitted notes"""
+    local = BM25Index()
+    local.add(split_passages(notes, settings.retrieval_passage_tokens))
+    # Short pasted notes may share no terms with the query: fall back to their opening passages
+    return lambda query: [p for _, p in local.search(query, k)] or local.passages[:k]
+
+
+def task_passages(topic: str, notes: str, material_ids: Optional[List[str]] = None) -> Dict[str, str]:
+    """Top-k passages per task: from the indexed uploads when known, else from the notes themselves"""
+    k = settings.retrieval_top_k
+    material_ids = material_index.indexed(material_ids or [])
+    if material_ids:
+        # Same fallback as for notes: a query sharing no terms gets the uploads' opening passages
+        search = lambda query: (material_index.search(query, k, digests=material_ids)
+                                or material_index.opening_passages(material_ids, k))
+    else:
+        search = notes_search(notes, k)
+    return {name: format_passages(search(f"{topic} {terms}")) for name, terms in TASK_QUERIES.items()}
+
+
+# Singleton instance
+material_index = MaterialIndex.from_settings(settings)
+material_store.evict_listeners.append(material_index.remove_material)
@@ -0,0 +1,238 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .config.settings import settings
+from .metrics import record_cache
+
+
+# arXiv query operators; case matters to the API, so cache keys keep them as written
+ARXIV_OPERATORS = {"AND", "OR", "ANDNOT"}
+
+
+def normalize_query(query: str, max_words: int = 5) -> str:
+    """Same simple sanitization the tool always applied: first words only"""
+    return " ".join(query.split()[:max_words])
+
+
+def cache_form(query: str) -> str:
+    """Case-folded query for cache keys and de-duplication (operators untouched)"""
+    return " ".join(w if w in ARXIV_OPERATORS else w.casefold() for w in query.split())
+
+
+class SearchResultCache:
+    """
+    Query -> result list cache for academic searches.
+    In-memory LRU in front of one JSON file per query under cache/arxiv.
+    Disk entries expire after `ttl_seconds`; once more than `max_entries`
+    files exist the least recently used (oldest mtime; hits touch the file)
+    are removed.
+    """
+
+    def __init__(self, cache_dir: Path, max_entries: int = 1000, ttl_seconds: float = 86400, memory_entries: int = 128):
+        self.cache_dir = Path(cache_dir)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.memory_entries = memory_entries
+        self._memory: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(query: str, max_results: int) -> str:
+        return hashlib.sha256(f"{cache_form(query)}\n{max_results}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str) -> Optional[List[Dict]]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and now - entry["created_at"] <= self.ttl_seconds:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return entry["results"]
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            entry = None
+        with self._lock:
+            if entry is None or now - entry["created_at"] > self.ttl_seconds:
+                self.misses += 1
+                return None
+            self._remember(key, entry)
+            self.hits += 1
+        os.utime(path)  # LRU order on disk
+        return entry["results"]
+
+    def _remember(self, key: str, entry: Dict):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def put(self, key: str, query: str, results: List[Dict]):
+        entry = {"query": query, "created_at": time.time(), "results": results}
+        with self._lock:
+            self._remember(key, entry)
+            self._writes += 1
+            prune = self._writes % 50 == 0
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        if prune:
+            self.prune()
+
+    def prune(self) -> int:
+        """Drop expired files, then the least recently used beyond max_entries"""
+        now = time.time()
+        files = []
+        for path in self.cache_dir.glob("*.json"):
+            try:
+                files.append((path.stat().st_mtime, path))
+            except OSError:
+                continue
+        files.sort()
+        removed = 0
+        for i, (mtime, path) in enumerate(files):
+            if now - mtime > self.ttl_seconds or len(files) - i > self.max_entries:
+                path.unlink(missing_ok=True)
+                removed += 1
+        return removed
+
+
+def _timeout_session(timeout: float):
+    """requests.Session that applies `timeout` to every request (arxiv.Client sets none)"""
+    import requests
+
+    class TimeoutSession(requests.Session):
+        def request(self, *args, **kwargs):
+            kwargs.setdefault("timeout", timeout)
+            return super().request(*args, **kwargs)
+
+    return TimeoutSession()
+
+
+class AcademicSearchClient:
+    """
+    Shared arXiv client for every agent and request.
+    One arxiv.Client (one HTTP session, one polite-use delay clock) serves all
+    searches through a single worker thread, results are cached on disk, and
+    concurrent identical queries share one in-flight request. Every HTTP
+    request and every caller's wait is bounded, so a hung connection cannot
+    hold up the searches queued behind it.
+    """
+
+    def __init__(self, cache: SearchResultCache, max_results: int = 3, delay_seconds: float = 3.0, num_retries: int = 3,
+                 request_timeout: float = 10.0, wait_timeout: float = 30.0):
+        self.cache = cache
+        self.max_results = max_results
+        self.delay_seconds = delay_seconds
+        self.num_retries = num_retries
+        self.request_timeout = request_timeout
+        self.wait_timeout = wait_timeout
+        self._client = None
+        self._worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="arxiv")
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.deduplicated = 0
+
+    @classmethod
+    def from_settings(cls, config) -> "AcademicSearchClient":
+        cache = SearchResultCache(
+            config.output_dir / "cache" / "arxiv",
+            max_entries=config.search_cache_max_entries,
+            ttl_seconds=config.search_cache_ttl_seconds,
+        )
+        return cls(cache, max_results=config.search_max_results, delay_seconds=config.arxiv_delay_seconds,
+                   request_timeout=config.arxiv_timeout_seconds, wait_timeout=config.search_timeout_seconds)
+
+    def _fetch(self, query: str, max_results: int) -> List[Dict]:
+        import arxiv
+
+        if self._client is None:
+            # page_size matches what we use, so a 3-result search is one small request
+            self._client = arxiv.Client(page_size=max_results, delay_seconds=self.delay_seconds, num_retries=self.num_retries)
+            self._client._session = _timeout_session(self.request_timeout)
+        search = arxiv.Search(query=query, max_results=max_results, sort_by=arxiv.SortCriterion.Relevance)
+        return [
+            {
+                "title": paper.title,
+                "authors": [str(a) for a in paper.authors[:2]],
+                "url": paper.entry_id,
+                "published": paper.published.strftime('%Y-%m-%d'),
+            }
+            for paper in self._client.results(search)
+        ]
+
+    def _run_search(self, key: str, query: str, max_results: int) -> List[Dict]:
+        try:
+            results = self._fetch(query, max_results)
+            self.cache.put(key, query, results)
+            return results
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _future_for(self, query: str, max_results: int) -> Future:
+        key = SearchResultCache.make_key(query, max_results)
+        cached = self.cache.get(key)
+        record_cache("search", cached is not None)
+        if cached is not None:
+            future: Future = Future()
+            future.set_result(cached)
+            return future
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.deduplicated += 1
+                return future
+            future = self._worker.submit(self._run_search, key, query, max_results)
+            self._inflight[key] = future
+            return future
+
+    def _timed_out(self) -> TimeoutError:
+        return TimeoutError(f"arXiv did not answer within {self.wait_timeout:g}s")
+
+    def search(self, query: str, max_results: Optional[int] = None) -> List[Dict]:
+        future = self._future_for(normalize_query(query), max_results or self.max_results)
+        try:
+            return future.result(timeout=self.wait_timeout)
+        except TimeoutError:
+            raise self._timed_out() from None
+
+    async def asearch(self, query: str, max_results: Optional[int] = None) -> List[Dict]:
+        """Awaitable search: waits on the shared request without blocking the event loop"""
+        future = asyncio.wrap_future(self._future_for(normalize_query(query), max_results or self.max_results))
+        try:
+            # Shielded: giving up must not cancel a request other callers share
+            return await asyncio.wait_for(asyncio.shield(future), timeout=self.wait_timeout)
+        except TimeoutError:
+            raise self._timed_out() from None
+
+    def stats(self) -> Dict:
+        return {
+            "hits": self.cache.hits,
+            "misses": self.cache.misses,
+            "deduplicated": self.deduplicated,
+            "in_flight": len(self._inflight),
+        }
+
+
+# Singleton instance
+search_client = AcademicSearchClient.from_settings(settings)
@@ -0,0 +1,207 @@
+import json
+import shutil
+import tarfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .config.settings import settings
+from .memory import StudyMemory
+from .memory_store import atomic_write_json, memory_writer
+
+
+class SessionManager:
+    """
+    Lifecycle of the per-session directories under outputs/memory.
+    Keeps an LRU of open StudyMemory objects so resumed sessions are served
+    from RAM, and a background sweeper that enforces retention (TTL, max
+    session count, max bytes). Evicted sessions are packed into a tarball per
+    sweep under memory/archive (or deleted when archiving is off) and can be
+    restored on demand; sessions with a run in progress are never touched.
+    """
+
+    def __init__(self, root: Path, ttl_seconds: float, max_sessions: int, max_bytes: int,
+                 archive: bool = True, cache_size: int = 32, sweep_interval: float = 600.0):
+        self.root = Path(root)
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.archive = archive
+        self.cache_size = cache_size
+        self.sweep_interval = sweep_interval
+        self._cache: "OrderedDict[str, StudyMemory]" = OrderedDict()
+        self._active: Dict[str, int] = {}
+        self._lock = threading.RLock()
+        self._sweeper: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_settings(cls, config) -> "SessionManager":
+        return cls(
+            config.output_dir / "memory",
+            ttl_seconds=config.session_ttl_days * 86400,
+            max_sessions=config.session_max_count,
+            max_bytes=config.session_max_mb * 1024 * 1024,
+            archive=config.session_archive,
+            cache_size=config.session_cache_size,
+            sweep_interval=config.session_sweep_seconds,
+        )
+
+    @property
+    def archive_dir(self) -> Path:
+        return self.root / "archive"
+
+    @property
+    def manifest_file(self) -> Path:
+        return self.archive_dir / "manifest.json"
+
+    # --- Hot sessions ---
+
+    def get(self, session_id: str) -> StudyMemory:
+        """Open (or create) a session, restoring it from the archive if it was swept"""
+        with self._lock:
+            memory = self._cache.get(session_id)
+            if memory is not None:
+                self._cache.move_to_end(session_id)
+                return memory
+            if not StudyMemory.session_exists(session_id):
+                self.restore(session_id)
+            memory = StudyMemory(session_id)
+            self._cache[session_id] = memory
+            self._trim_cache(keep=session_id)
+            return memory
+
+    def _trim_cache(self, keep: Optional[str] = None):
+        """Drop least recently used idle sessions over cache_size (caller holds self._lock)"""
+        # Running sessions stay cached even past cache_size: evicting one would
+        # split its writes across two StudyMemory objects
+        excess = len(self._cache) - self.cache_size
+        if excess <= 0:
+            return
+        idle = [sid for sid in self._cache if sid not in self._active and sid != keep]
+        for session_id in idle[:excess]:
+            del self._cache[session_id]
+
+    def exists(self, session_id: str) -> bool:
+        return StudyMemory.session_exists(session_id) or session_id in self._load_manifest()
+
+    @contextmanager
+    def active(self, session_id: str):
+        """Protect a session from the sweeper while a run writes to it"""
+        with self._lock:
+            self._active[session_id] = self._active.get(session_id, 0) + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._active[session_id] -= 1
+                if not self._active[session_id]:
+                    del self._active[session_id]
+                    self._trim_cache()
+
+    # --- Archive ---
+
+    def _load_manifest(self) -> Dict[str, str]:
+        try:
+            with open(self.manifest_file, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def restore(self, session_id: str) -> bool:
+        """Unpack one archived session back into the memory directory"""
+        with self._lock:
+            manifest = self._load_manifest()
+            tarball = manifest.get(session_id)
+            if tarball is None:
+                return False
+            with tarfile.open(self.archive_dir / tarball, "r:gz") as tar:
+                members = [m for m in tar.getmembers() if m.name.split("/")[0] == session_id]
+                tar.extractall(self.root, members=members, filter="data")
+            del manifest[session_id]
+            atomic_write_json(self.manifest_file, manifest)
+        print(f"[SESSIONS] Restored {session_id} from {tarball}")
+        return True
+
+    def _archive(self, session_ids: List[str]):
+        memory_writer.flush()
+        if self.archive:
+            self.archive_dir.mkdir(parents=True, exist_ok=True)
+            tarball = f"sessions-{time.strftime('%Y%m%d-%H%M%S')}-{time.time_ns() % 1000000:06d}.tar.gz"
+            with tarfile.open(self.archive_dir / tarball, "w:gz") as tar:
+                for session_id in session_ids:
+                    tar.add(self.root / session_id, arcname=session_id)
+            manifest = self._load_manifest()
+            manifest.update({session_id: tarball for session_id in session_ids})
+            atomic_write_json(self.manifest_file, manifest)
+        for session_id in session_ids:
+            shutil.rmtree(self.root / session_id, ignore_errors=True)
+
+    # --- Retention ---
+
+    def _sessions(self) -> List[Dict]:
+        sessions = []
+        for session_dir in self.root.iterdir():
+            if not (session_dir / "context.json").exists():
+                continue  # index files, archive dir, plan index
+            files = [p.stat() for p in session_dir.iterdir() if p.is_file()]
+            sessions.append({
+                "session_id": session_dir.name,
+                "last_active": max(s.st_mtime for s in files),
+                "size": sum(s.st_size for s in files),
+            })
+        return sorted(sessions, key=lambda s: s["last_active"])
+
+    def sweep(self) -> int:
+        """Archive sessions past the TTL, then the oldest until count and size fit"""
+        memory_writer.flush()  # queued appends count as activity
+        with self._lock:
+            sessions = [s for s in self._sessions() if s["session_id"] not in self._active]
+            now = time.time()
+            evict = [s for s in sessions if now - s["last_active"] > self.ttl_seconds]
+            kept = [s for s in sessions if s not in evict]
+            total = sum(s["size"] for s in kept)
+            while kept and (len(kept) > self.max_sessions or total > self.max_bytes):
+                oldest = kept.pop(0)
+                evict.append(oldest)
+                total -= oldest["size"]
+            if not evict:
+                return 0
+            ids = [s["session_id"] for s in evict]
+            for session_id in ids:
+                self._cache.pop(session_id, None)
+            self._archive(ids)
+        action = "Archived" if self.archive else "Deleted"
+        print(f"[SESSIONS] {action} {len(ids)} sessions ({len(kept)} kept)")
+        return len(ids)
+
+    def _sweep_loop(self):
+        while True:
+            time.sleep(self.sweep_interval)
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"[SESSIONS] Sweep failed: {e}")
+
+    def start_sweeper(self):
+        """Start the background retention thread (idempotent)"""
+        with self._lock:
+            if self._sweeper is None:
+                self._sweeper = threading.Thread(target=self._sweep_loop, name="session-sweeper", daemon=True)
+                self._sweeper.start()
+
+    def stats(self) -> Dict:
+        sessions = self._sessions()
+        return {
+            "sessions": len(sessions),
+            "bytes": sum(s["size"] for s in sessions),
+            "cached": len(self._cache),
+            "active": len(self._active),
+            "archived": len(self._load_manifest()),
+        }
+
+
+# Singleton instance
+session_manager = SessionManager.from_settings(settings)
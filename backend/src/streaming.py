@@ -0,0 +1,205 @@
+import asyncio
+import itertools
+import json
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional
+
+from .config.settings import settings
+from .log_capture import capture_session, flush_current
+
+# Channel of the session whose code is running in this thread / task
+current_channel: ContextVar[Optional["RunChannel"]] = ContextVar("smartstudy_channel", default=None)
+# Agent whose LLM output is forwarded token by token as `delta` events (set per task)
+current_delta_agent: ContextVar[Optional[str]] = ContextVar("smartstudy_delta_agent", default=None)
+_delta_calls = itertools.count(1)
+
+
+def merge_delta(previous: Optional[Dict], event: Dict) -> Optional[Dict]:
+    """One event carrying both texts if they are consecutive deltas of the same LLM call"""
+    if (previous is None or previous["event"] != "delta" or event["event"] != "delta"
+            or previous["data"]["call"] != event["data"]["call"]):
+        return None
+    return {"event": "delta", "data": {**previous["data"], "text": previous["data"]["text"] + event["data"]["text"]}}
+
+
+class AsyncSubscriber:
+    """
+    One streaming client's inbox, owned by its event loop.
+    Worker threads hand events over with loop.call_soon_threadsafe, so the
+    client awaits an asyncio.Event instead of parking a thread on queue.get.
+    Backpressure: if a slow client falls behind, log events beyond
+    `max_pending_logs` are dropped (and counted); typed events never are,
+    but consecutive deltas of one LLM call are merged while they wait.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, max_pending_logs: int):
+        self.loop = loop
+        self.max_pending_logs = max_pending_logs
+        self.pending: deque = deque()
+        self.pending_logs = 0
+        self.dropped_logs = 0
+        self.ready = asyncio.Event()
+
+    def push(self, event: Optional[Dict]):
+        """Thread-safe; raises RuntimeError once the client's loop is closed"""
+        self.loop.call_soon_threadsafe(self._offer, event)
+
+    def _offer(self, event: Optional[Dict]):
+        if event is not None and event["event"] == "log":
+            if self.pending_logs >= self.max_pending_logs:
+                self.dropped_logs += 1
+                return
+            self.pending_logs += 1
+        merged = merge_delta(self.pending[-1], event) if event is not None and self.pending else None
+        if merged is not None:
+            self.pending[-1] = merged
+        else:
+            self.pending.append(event)
+        self.ready.set()
+
+    def drain(self) -> List[Optional[Dict]]:
+        batch = list(self.pending)
+        self.pending.clear()
+        self.pending_logs = 0
+        self.ready.clear()
+        if self.dropped_logs:
+            notice = {"event": "log", "data": {"text": f"[STREAM] {self.dropped_logs} log chunks skipped (client fell behind)\n"}}
+            batch.insert(0, notice)
+            self.dropped_logs = 0
+        return batch
+
+
+class RunChannel:
+    """
+    Fan-out of one crew run's typed event stream.
+    Also accepts raw log chunks through put(), so it can back a log sink; every
+    attached client receives the full history first, then live events.
+    """
+
+    def __init__(self):
+        self.history: List[Dict] = []
+        self.subscribers: List[AsyncSubscriber] = []
+        self.closed = False
+        self._lock = threading.Lock()
+
+    def publish(self, event: str, data):
+        self._dispatch({"event": event, "data": data})
+
+    def put(self, chunk: Optional[str]):
+        """Log-sink entry point; None closes the channel"""
+        if chunk is None:
+            self.close()
+        else:
+            self.publish("log", {"text": chunk})
+
+    def close(self):
+        self._dispatch(None)
+
+    def _dispatch(self, event: Optional[Dict]):
+        with self._lock:
+            if self.closed:
+                return
+            if event is None:
+                self.closed = True
+            else:
+                # Replay history keeps each LLM call's deltas as one event
+                merged = merge_delta(self.history[-1], event) if self.history else None
+                if merged is not None:
+                    self.history[-1] = merged
+                else:
+                    self.history.append(event)
+            for subscriber in list(self.subscribers):
+                try:
+                    subscriber.push(event)
+                except RuntimeError:
+                    # Client's event loop is gone
+                    self.subscribers.remove(subscriber)
+            if self.closed:
+                self.subscribers = []
+
+    def subscribe(self, loop: asyncio.AbstractEventLoop, greeting: Optional[Dict] = None) -> AsyncSubscriber:
+        subscriber = AsyncSubscriber(loop, settings.stream_max_pending_logs)
+        with self._lock:
+            if greeting:
+                subscriber._offer(greeting)
+            for event in self.history:
+                subscriber._offer(event)
+            if self.closed:
+                subscriber._offer(None)
+            else:
+                self.subscribers.append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: AsyncSubscriber):
+        with self._lock:
+            if subscriber in self.subscribers:
+                self.subscribers.remove(subscriber)
+
+
+def emit_event(event: str, data):
+    """Publish a typed event to the current session's stream (no-op outside a session)"""
+    channel = current_channel.get()
+    if channel is not None:
+        flush_current()
+        channel.publish(event, data)
+
+
+@contextmanager
+def stream_deltas(agent: str):
+    """Forward the text of LLM calls made inside to the session as `delta` events of `agent`"""
+    token = current_delta_agent.set(agent)
+    try:
+        yield
+    finally:
+        current_delta_agent.reset(token)
+
+
+def delta_publisher() -> Optional[Callable[[str], None]]:
+    """Publisher for one LLM call's text chunks, or None when no session is watching"""
+    channel = current_channel.get()
+    agent = current_delta_agent.get()
+    if channel is None or agent is None or not settings.llm_stream_deltas:
+        return None
+    call = next(_delta_calls)  # lets the client start a fresh draft for each call
+
+    def publish(text: str):
+        if text:
+            channel.publish("delta", {"agent": agent, "call": call, "text": text})
+    return publish
+
+
+@contextmanager
+def stream_session(channel: RunChannel):
+    """Bind a channel for typed events and capture printed logs into it"""
+    token = current_channel.set(channel)
+    try:
+        with capture_session(channel):
+            yield channel
+    finally:
+        current_channel.reset(token)
+
+
+def format_sse(event: Dict) -> str:
+    return f"event: {event['event']}\ndata: {json.dumps(event['data'], ensure_ascii=False)}\n\n"
+
+
+async def sse_events(channel: RunChannel, greeting: Optional[Dict] = None):
+    """Async generator of Server-Sent Event frames for one client, with heartbeats"""
+    subscriber = channel.subscribe(asyncio.get_running_loop(), greeting)
+    try:
+        while True:
+            try:
+                await asyncio.wait_for(subscriber.ready.wait(), timeout=settings.sse_heartbeat_seconds)
+            except asyncio.TimeoutError:
+                yield ": heartbeat\n\n"
+                continue
+            for event in subscriber.drain():
+                if event is None:
+                    yield format_sse({"event": "done", "data": {}})
+                    return
+                yield format_sse(event)
+    finally:
+        channel.unsubscribe(subscriber)
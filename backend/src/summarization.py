@@ -0,0 +1,72 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from .chunking import chunk_text
+from .config.settings import settings
+from .prompts import get_chunk_summary_prompt, get_reduce_prompt
+from .rate_limiter import estimate_tokens
+
+
+class MapReduceSummarizer:
+    """
+    Condenses materials too long for a single prompt.
+    Map: token-budgeted chunks (cut at page / heading boundaries) are
+    summarized side by side on the given LLM. Reduce: partial summaries are
+    merged in groups of `reduce_fan_in` until one digest fits `target_tokens`.
+    Work is bounded: about len(text)/chunk_tokens map calls plus a
+    logarithmic number of reduce rounds.
+    """
+
+    def __init__(self, llm, chunk_tokens: int = 3000, max_parallel: int = 4, reduce_fan_in: int = 4):
+        self.llm = llm
+        self.chunk_tokens = chunk_tokens
+        self.max_parallel = max(1, max_parallel)
+        self.reduce_fan_in = max(2, reduce_fan_in)
+
+    @classmethod
+    def from_settings(cls, llm, config) -> "MapReduceSummarizer":
+        return cls(llm, config.summary_chunk_tokens, config.summary_max_parallel, config.summary_reduce_fan_in)
+
+    def _ask(self, prompt: str) -> str:
+        return str(self.llm.invoke(prompt).content).strip()
+
+    def _map(self, prompts: List[str]) -> List[str]:
+        """Run prompts concurrently, keeping order (each call inherits the session's log routing)"""
+        with ThreadPoolExecutor(max_workers=min(self.max_parallel, len(prompts))) as pool:
+            futures = [pool.submit(contextvars.copy_context().run, self._ask, p) for p in prompts]
+            return [f.result() for f in futures]
+
+    def summarize(self, topic: str, text: str, target_tokens: int, page_offsets: Optional[List[int]] = None) -> str:
+        chunks = chunk_text(text, self.chunk_tokens, page_offsets)
+        if len(chunks) == 1 and estimate_tokens(text) <= target_tokens:
+            return text
+
+        print(f"[NOTES] Map: summarizing {len(chunks)} chunks of ~{self.chunk_tokens} tokens")
+        partials = self._map([
+            get_chunk_summary_prompt(topic, chunk, i + 1, len(chunks))
+            for i, chunk in enumerate(chunks)
+        ])
+
+        level = 1
+        while len(partials) > 1 or estimate_tokens(partials[0]) > target_tokens:
+            if len(partials) == 1:
+                # A single oversized digest: split it again rather than looping on it
+                partials = chunk_text(partials[0], self.chunk_tokens)
+                if len(partials) == 1:
+                    break
+            groups = [partials[i:i + self.reduce_fan_in] for i in range(0, len(partials), self.reduce_fan_in)]
+            print(f"[NOTES] Reduce round {level}: {len(partials)} parts -> {len(groups)}")
+            partials = self._map([get_reduce_prompt(topic, group) for group in groups])
+            level += 1
+            if level > 8:
+                break
+        return partials[0]
+
+
+def condense_notes(llm, topic: str, notes: str, page_offsets: Optional[List[int]] = None) -> str:
+    """Notes as-is when they fit the prompt budget, otherwise a map-reduce digest (split on pages when known)"""
+    if estimate_tokens(notes) <= settings.notes_token_budget:
+        return notes
+    summarizer = MapReduceSummarizer.from_settings(llm, settings)
+    return summarizer.summarize(topic, notes, settings.notes_token_budget, page_offsets)
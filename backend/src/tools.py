@@ -1,48 +1,54 @@
-import arxiv
 from pathlib import Path
 from crewai.tools import BaseTool
+from .config.settings import settings
+from .search_client import normalize_query, search_client
+from .material_store import material_store
+from .metrics import timed_tool
 
 class AcademicSearchTool(BaseTool):
     """Search academic resources for study materials"""
     name: str = "Academic Resource Search"
     description: str = "Search arXiv for academic papers related to study topics. Input: research topic string."
     
+    @staticmethod
+    def _format(query: str, papers: list) -> str:
+        if not papers:
+            return f"No academic resources found for: {query}\nSuggestion: Try broader terms like 'machine learning' instead of specific algorithms"
+        results = []
+        for i, paper in enumerate(papers):
+            results.append(
+                f"{i+1}. **{paper['title']}**\n"
+                f"   Authors: {', '.join(paper['authors'])}\n"
+                f"   URL: {paper['url']}\n"
+                f"   Published: {paper['published']}\n"
+            )
+        return "📚 **Recommended Academic Resources**:\n\n" + "\n".join(results)
+    
+    @timed_tool
     def _run(self, query: str) -> str:
-        """Search arXiv for relevant papers"""
+        """Search arXiv for relevant papers (shared client, cached)"""
         try:
-            # Simple query sanitization
-            clean_query = " ".join(query.split()[:5])  # Limit to first 5 words
-            
-            client = arxiv.Client()
-            search = arxiv.Search(
-                query=clean_query,
-                max_results=3,
-                sort_by=arxiv.SortCriterion.Relevance
-            )
-            
-            results = []
-            for i, paper in enumerate(client.results(search)):
-                authors = ", ".join(str(a) for a in paper.authors[:2])
-                results.append(
-                    f"{i+1}. **{paper.title}**\n"
-                    f"   Authors: {authors}\n"
-                    f"   URL: {paper.entry_id}\n"
-                    f"   Published: {paper.published.strftime('%Y-%m-%d')}\n"
-                )
-            
-            if not results:
-                return f"No academic resources found for: {clean_query}\nSuggestion: Try broader terms like 'machine learning' instead of specific algorithms"
-            
-            return "📚 **Recommended Academic Resources**:\n\n" + "\n".join(results)
+            clean_query = normalize_query(query)
+            return self._format(clean_query, search_client.search(clean_query))
+        except Exception as e:
+            return f"Search error: {str(e)}. Try simpler search terms."
+    
+    @timed_tool
+    async def _arun(self, query: str) -> str:
+        """Async path: awaits the shared request instead of holding a thread"""
+        try:
+            clean_query = normalize_query(query)
+            return self._format(clean_query, await search_client.asearch(clean_query))
         except Exception as e:
             return f"Search error: {str(e)}. Try simpler search terms."
 
 class FileHandlerTool(BaseTool):
     """Handle reading/writing study materials securely"""
     name: str = "Study Material Handler"
-    description: str = "Read or write files. Usage: action='write', filename='notes.txt', content='...' OR action='read', filename='notes.txt'"
+    description: str = "Read or write files; 'read' also opens uploaded materials by filename or SHA-256. Usage: action='write', filename='notes.txt', content='...' OR action='read', filename='notes.txt'"
     output_dir: str = "./outputs/materials"
     
+    @timed_tool
     def _run(self, action: str, filename: str, content: str = None) -> str:
         """Dispatch file operation"""
         try:
@@ -58,7 +64,7 @@ class FileHandlerTool(BaseTool):
                     return "Error: Content is required for write action"
                 return self._write_file(clean_filename, content, out_path)
             elif action == "read":
-                return self._read_file(clean_filename, out_path)
+                return self._read_file(clean_filename, out_path, requested=filename)
             else:
                 return f"Error: Unsupported action '{action}'. Use 'write' or 'read'"
         except Exception as e:
@@ -86,15 +92,62 @@ class FileHandlerTool(BaseTool):
         except Exception as e:
             return f"Write error: {str(e)}"
     
-    def _read_file(self, filename: str, base_dir: Path) -> str:
-        """Read file content"""
+    def _read_file(self, filename: str, base_dir: Path, requested: str = None) -> str:
+        """Read file content; uploads are read from the material store's extracted text"""
         try:
             filepath = self._get_safe_path(filename, base_dir)
-            if not filepath.exists():
-                return f"Error: File not found: {filename}"
-            with open(filepath, "r", encoding="utf-8") as f:
-                content = f.read()
+            if filepath.is_file():
+                with open(filepath, "r", encoding="utf-8") as f:
+                    content = f.read()
+            else:
+                record = material_store.find(requested or filename)
+                if record is None:
+                    return f"Error: File not found: {filename}"
+                filename, content = record["filename"], record["text"]
             preview = content[:500] + "..." if len(content) > 500 else content
             return f"📄 {filename} ({len(content)} chars):\n{preview}"
         except Exception as e:
             return f"Read error: {str(e)}"
+
+class MaterialSearchTool(BaseTool):
+    """Look up passages in the student's uploaded materials"""
+    name: str = "Study Material Search"
+    description: str = "Search the uploaded study materials for passages about a subtopic. Input: search query string."
+    material_ids: list = []  # restrict to this session's uploads (empty = all materials)
+    notes: str = ""  # searched instead when none of material_ids is indexed any more
+
+    @timed_tool
+    def _run(self, query: str) -> str:
+        """Return the best-matching passages with their source file and page"""
+        from .retrieval import format_passages, material_index, notes_search
+        try:
+            k = settings.retrieval_top_k
+            if not self.material_ids:
+                return format_passages(material_index.search(query, k=k))
+            digests = material_index.indexed(self.material_ids)
+            if not digests:
+                return format_passages(notes_search(self.notes, k)(query))
+            return format_passages(material_index.search(query, k=k, digests=digests))
+        except Exception as e:
+            return f"Material search error: {str(e)}"
+
+class ResourceCatalogTool(BaseTool):
+    """Look up resources in the prebuilt offline catalog (no network)"""
+    name: str = "Offline Resource Catalog"
+    description: str = "Search a local catalog of open courses, lecture notes and papers. Input: search query string."
+
+    @timed_tool
+    def _run(self, query: str) -> str:
+        """Return the best catalog matches as a markdown list"""
+        from .catalog import resource_catalog
+        try:
+            records = resource_catalog.search(query, k=settings.catalog_top_k)
+            if not records:
+                return "No catalog resources found"
+            lines = []
+            for r in records:
+                description = f" - {r['description'][:160]}" if r["description"] else ""
+                lines.append(f"- [{r['type']}] [{r['title']}]({r['url']}) ({r['source']}){description}")
+            return "\n".join(lines)
+        except Exception as e:
+            return f"Catalog search error: {str(e)}"
@@ -0,0 +1,144 @@
+import importlib
+import re
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .config.settings import settings
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+IMPORTTIME_LINE = re.compile(r"import time:\s*(\d+)\s*\|\s*(\d+)\s*\|(\s*)(\S+)")
+
+
+def _import(name: str) -> Callable[[], None]:
+    return lambda: importlib.import_module(name)
+
+
+def _load_configs():
+    from .registry import config_registry
+    config_registry.tasks()
+    config_registry.agents()
+
+
+def _load_material_index():
+    from .retrieval import material_index
+    material_index._ensure_loaded()
+    material_index._load_encoder()
+
+
+def _start_parser_workers():
+    from .extraction import warm_workers
+    warm_workers()
+
+
+# (name, step) in order; the crew stack goes first because it is what a run waits on
+WARMUP_STEPS: List[Tuple[str, Callable[[], None]]] = [
+    ("llm_stack", _import("src.agents")),      # crewai, langchain_google_genai, key pool
+    ("crew", _import("src.crew")),
+    ("configs", _load_configs),
+    ("material_index", _load_material_index),
+    ("parser_workers", _start_parser_workers),  # pypdf / python-docx / python-pptx in each worker
+    ("catalog", _import("src.catalog")),
+]
+
+
+class WarmUp:
+    """
+    Background warm-up that runs once the server is accepting connections.
+    Heavy stacks (CrewAI, LangChain/Gemini, document parsers) are imported
+    here instead of at module import, so the process binds its port quickly;
+    anything requested before warm-up reaches it is imported on first use.
+    /ready reports ready once every step has run.
+    """
+
+    def __init__(self, steps: List[Tuple[str, Callable[[], None]]]):
+        self.steps = steps
+        self.ready = threading.Event()
+        self.timings: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+        self.started_at: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def run(self):
+        self.started_at = time.monotonic()
+        for name, step in self.steps:
+            started = time.monotonic()
+            try:
+                step()
+            except Exception as e:
+                # A failed step only means the first request pays for it instead
+                self.errors[name] = str(e)
+                print(f"[WARMUP] {name} failed: {e}")
+            self.timings[name] = round(time.monotonic() - started, 3)
+        total = time.monotonic() - self.started_at
+        summary = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in self.timings.items())
+        print(f"[WARMUP] Ready in {total:.2f}s ({summary})")
+        self.ready.set()
+
+    def start(self):
+        """Run the steps on a daemon thread (idempotent); with warm-up disabled, ready at once"""
+        with self._lock:
+            if self._thread is not None or self.ready.is_set():
+                return
+            if not settings.warmup_enabled:
+                self.ready.set()
+                return
+            self._thread = threading.Thread(target=self.run, name="warmup", daemon=True)
+            self._thread.start()
+
+    def status(self) -> Dict:
+        return {
+            "ready": self.ready.is_set(),
+            "steps": dict(self.timings),
+            "pending": [name for name, _ in self.steps if name not in self.timings] if settings.warmup_enabled else [],
+            "errors": dict(self.errors),
+            "elapsed_seconds": round(time.monotonic() - self.started_at, 3) if self.started_at else 0.0,
+        }
+
+
+def loaded_module(name: str):
+    """The module if it is fully imported, else None (never triggers or waits for the import)"""
+    module = sys.modules.get(name)
+    if module is None or getattr(module.__spec__, "_initializing", False):
+        return None  # still executing on the warm-up thread
+    return module
+
+
+def import_profile(statement: str = "import main", top: int = 15) -> Dict:
+    """Run `statement` in a fresh interpreter under -X importtime and rank the slowest imports"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=BACKEND_DIR, capture_output=True, text=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append({"module": module, "self_ms": int(self_us) / 1000,
+                         "cumulative_ms": int(cumulative_us) / 1000, "depth": len(indent) // 2})
+    top_level = [r for r in rows if r["depth"] == 0]
+    return {
+        "statement": statement,
+        "total_ms": round(sum(r["cumulative_ms"] for r in top_level), 1),
+        "slowest_cumulative": sorted(rows, key=lambda r: r["cumulative_ms"], reverse=True)[:top],
+        "slowest_self": sorted(rows, key=lambda r: r["self_ms"], reverse=True)[:top],
+    }
+
+
+# Singleton instance
+warmup = WarmUp(WARMUP_STEPS)
+
+
+if __name__ == "__main__":
+    # python -m src.warmup  -> cold import profile of the server module, then timed warm-up steps
+    profile = import_profile()
+    print(f"Cold `{profile['statement']}`: {profile['total_ms']:.0f} ms")
+    for row in profile["slowest_cumulative"]:
+        print(f"  {row['cumulative_ms']:9.1f} ms  {'  ' * row['depth']}{row['module']}")
+    warmup.run()
+    print(warmup.status())
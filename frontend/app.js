@@ -1,3 +1,8 @@
+// Content hashes of the uploads the notes came from (scopes retrieval on the server)
+let uploadedMaterialIds = [];
+// Last finished session; reruns send it so the server only regenerates what changed
+let lastSessionId = null;
+
 // TAB NAVIGATION SYSTEM
 document.querySelectorAll('.tab-btn').forEach(btn => {
     btn.addEventListener('click', () => {
@@ -61,58 +66,70 @@ document.getElementById('runButton').addEventListener('click', async () => {
         const response = await fetch('http://localhost:8081/generate-plan', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ topic, notes })
+            body: JSON.stringify({ topic, notes, material_ids: uploadedMaterialIds, base_session_id: lastSessionId })
         });
 
-        if (!response.ok) throw new Error("API connection failed");
-
-        const reader = response.body.getReader();
-        const decoder = new TextDecoder();
+        if (!response.ok) {
+            const body = await response.json().catch(() => ({}));
+            const detail = body.detail || {};
+            throw new Error(detail.error ? `${detail.error} (retry in ~${detail.eta_seconds}s)` : "API connection failed");
+        }
 
         let fullReport = "";
-        let memoryData = "";
-        let inFinalReport = false;
-        let inMemory = false;
-
-        while (true) {
-            const { value, done } = await reader.read();
-            if (done) break;
-
-            const chunk = decoder.decode(value, { stream: true });
-
-            // Check for final report marker
-            if (chunk.includes("[FINAL_REPORT]")) {
-                inFinalReport = true;
-                inMemory = false;
-                const parts = chunk.split("[FINAL_REPORT]");
-                if (parts[0]) processLogs(parts[0], telemetry, activeAgentDisp);
-                fullReport = parts[1] || "";
-                updateSections(fullReport);
-                continue;
-            }
-
-            // Check for memory summary marker
-            if (chunk.includes("[MEMORY_SUMMARY]")) {
-                inMemory = true;
-                inFinalReport = false;
-                const parts = chunk.split("[MEMORY_SUMMARY]");
-                if (parts[0] && !inFinalReport) processLogs(parts[0], telemetry, activeAgentDisp);
-                memoryData = parts[1] || "";
-                updateMemoryDisplay(memoryData);
-                continue;
-            }
-
-            // Accumulate data
-            if (inFinalReport) {
-                fullReport += chunk;
-                updateSections(fullReport);
-            } else if (inMemory) {
-                memoryData += chunk;
-                updateMemoryDisplay(memoryData);
-            } else {
-                processLogs(chunk, telemetry, activeAgentDisp);
+        // Dashboard section of each specialist (from agent_start) and the answer each is writing
+        const sectionByAgent = {};
+        const drafts = {};
+        const finishedSections = new Set();
+
+        await readEventStream(response, (event, data) => {
+            switch (event) {
+                case 'log':
+                    processLogs(data.text, telemetry, activeAgentDisp);
+                    break;
+                case 'queue':
+                    processLogs(`[QUEUE] Position ${data.position} in line, ETA ~${data.eta_seconds}s`, telemetry, activeAgentDisp);
+                    break;
+                case 'agent_start':
+                    activeAgentDisp.textContent = data.agent;
+                    if (data.section) sectionByAgent[data.agent.trim()] = data.section;
+                    break;
+                case 'delta': {
+                    // Tokens of an answer still being written; the `section` event replaces the draft
+                    let draft = drafts[data.agent];
+                    if (!draft || draft.call !== data.call) draft = drafts[data.agent] = { call: data.call, text: '' };
+                    draft.text += data.text;
+                    const section = sectionByAgent[data.agent];
+                    if (!section) {
+                        statusText.textContent = `✍️ ${data.agent} writing (${draft.text.length} chars)`;
+                    } else if (!finishedSections.has(section)) {
+                        renderDraft(`${section}Output`, draft.text);
+                    }
+                    break;
+                }
+                case 'task_done':
+                    processLogs(`[TASK_DONE] ${data.agent} finished.`, telemetry, activeAgentDisp);
+                    break;
+                case 'section':
+                    finishedSections.add(data.section);
+                    renderSection(`${data.section}Output`, data.markdown);
+                    break;
+                case 'final_report':
+                    fullReport = data.markdown;
+                    document.querySelectorAll('.markdown-body.streaming').forEach(el => el.classList.remove('streaming'));
+                    updateSections(fullReport);
+                    break;
+                case 'memory_summary':
+                    updateMemoryDisplay(data.text);
+                    break;
+                case 'session':
+                    lastSessionId = data.session_id;
+                    telemetry.innerHTML += `<div class="log-line">> SESSION: ${data.session_id}</div>`;
+                    break;
+                case 'error':
+                    // Finished steps are checkpointed server-side; POST /resume/<session_id> completes the run
+                    throw new Error(data.session_id ? `${data.message} (resumable: session ${data.session_id})` : data.message);
             }
-        }
+        });
 
         // Success state
         statusText.textContent = "✅ Mission Complete";
@@ -132,6 +149,11 @@ document.getElementById('runButton').addEventListener('click', async () => {
     }
 });
 
+// Edited or replaced notes no longer match the upload: retrieval must use what is submitted
+document.getElementById('notesInput').addEventListener('input', () => {
+    uploadedMaterialIds = [];
+});
+
 // FILE UPLOAD HANDLER
 document.getElementById('fileUpload').addEventListener('change', async (e) => {
     const file = e.target.files[0];
@@ -153,6 +175,7 @@ document.getElementById('fileUpload').addEventListener('change', async (e) => {
 
         if (data.text) {
             document.getElementById('notesInput').value = data.text;
+            uploadedMaterialIds = data.sha256 ? [data.sha256] : [];
             statusSpan.textContent = `✅ ${file.name} loaded`;
             statusSpan.style.color = "#4caf50";
             setTimeout(() => {
@@ -170,6 +193,38 @@ document.getElementById('fileUpload').addEventListener('change', async (e) => {
 });
 
 
+// SERVER-SENT EVENTS
+// Frames are buffered until the blank-line terminator, so an event split
+// across network chunks is only dispatched once it is complete.
+async function readEventStream(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+
+        buffer += decoder.decode(value, { stream: true });
+        let boundary;
+        while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+            const frame = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+
+            let event = "message";
+            const dataLines = [];
+            frame.split("\n").forEach(line => {
+                if (line.startsWith(":")) return; // heartbeat / comment
+                if (line.startsWith("event:")) event = line.slice(6).trim();
+                else if (line.startsWith("data:")) dataLines.push(line.slice(5).trimStart());
+            });
+            if (!dataLines.length) continue;
+            if (event === "done") return;
+            onEvent(event, JSON.parse(dataLines.join("\n")));
+        }
+    }
+}
+
 // LOG PROCESSING
 function processLogs(chunk, telemetryEl, agentEl) {
     const lines = chunk.split('\n');
@@ -191,6 +246,35 @@ function processLogs(chunk, telemetryEl, agentEl) {
     });
 }
 
+// Live preview of a section while its agent is still writing (at most one re-render per frame)
+const pendingDrafts = {};
+function renderDraft(elementId, text) {
+    const scheduled = elementId in pendingDrafts;
+    pendingDrafts[elementId] = text;
+    if (scheduled) return;
+    requestAnimationFrame(() => {
+        const draft = pendingDrafts[elementId];
+        delete pendingDrafts[elementId];
+        const el = document.getElementById(elementId);
+        if (!el || draft === undefined) return;
+        // ReAct-style answers put the deliverable after "Final Answer:"
+        const marker = draft.lastIndexOf('Final Answer:');
+        el.innerHTML = marked.parse(marker === -1 ? draft : draft.slice(marker + 'Final Answer:'.length));
+        el.classList.add('streaming');
+    });
+}
+
+// Render one agent's section as soon as its task completes
+function renderSection(elementId, markdown) {
+    const el = document.getElementById(elementId);
+    if (!el || !markdown) return;
+    delete pendingDrafts[elementId];
+    el.classList.remove('streaming');
+    el.innerHTML = marked.parse(markdown);
+    enhanceUI();
+    if (window.MathJax) MathJax.typesetPromise();
+}
+
 function updateSections(markdown) {
     const sections = {
         summaryOutput: [/^#\s*High-Yield Content Analysis/im, /^#\s*Content Analysis/im],
@@ -486,6 +570,8 @@ document.getElementById('newSessionBtn')?.addEventListener('click', () => {
         document.getElementById('studyDashboard').classList.add('hidden');
         document.getElementById('topicInput').value = '';
         document.getElementById('notesInput').value = '';
+        uploadedMaterialIds = [];
+        lastSessionId = null;
         document.getElementById('currentStatus').textContent = 'System Ready';
         document.getElementById('activeAgent').textContent = 'Idle';
         document.getElementById('telemetryLog').innerHTML = '<div class="log-line">> System reset. Ready for mission...</div>';